@@ -1,13 +1,33 @@
 """Configuration management for DataHub."""
 
+import copy
 import json
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 DEFAULT_CONFIG_DIR = Path.home() / ".datahub"
 DEFAULT_DB_PATH = DEFAULT_CONFIG_DIR / "datahub.db"
 DEFAULT_CONFIG_PATH = DEFAULT_CONFIG_DIR / "config.json"
 
+# Parsed config files keyed by path, tagged with the (mtime_ns, size, inode)
+# they were parsed at; a stat is enough to tell whether a file needs
+# re-reading. _save replaces the file (new inode) and drops the entry, so a
+# same-size rewrite within the mtime granularity can't hit a stale parse.
+_PARSE_CACHE: dict[Path, tuple[tuple[int, int, int], dict[str, Any]]] = {}
+
+# Stands in for "no value" in the lookup cache, since None means the same there
+_MISSING = object()
+
+
+@lru_cache(maxsize=256)
+def _split_key(key: str) -> tuple[str, ...]:
+    """Split a dotted key once; callers reuse the same handful of keys."""
+    return tuple(key.split("."))
+
 
 class Config:
     """Manages DataHub configuration."""
@@ -16,51 +36,130 @@ class Config:
         self.config_path = config_path or DEFAULT_CONFIG_PATH
         self.config_dir = self.config_path.parent
         self._data: dict[str, Any] = {}
+        # Resolved get() lookups, cleared whenever _data is reloaded or set
+        self._get_cache: dict[str, Any] = {}
+        # While batching, set() only marks the config dirty; batch() saves once
+        self._in_batch = False
+        self._dirty = False
+        # Set once config_dir is known to exist, so saves skip the mkdir
+        self._dir_exists = False
         self._load()
 
     def _load(self) -> None:
-        """Load config from disk."""
-        if self.config_path.exists():
-            self._data = json.loads(self.config_path.read_text())
-        else:
+        """Load config from disk, reusing the parse of an unchanged file."""
+        self._get_cache.clear()
+        try:
+            st = os.stat(self.config_path)
+        except FileNotFoundError:
             self._data = {}
+            return
+        self._dir_exists = True
+
+        stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        cached = _PARSE_CACHE.get(self.config_path)
+        if cached is not None and cached[0] == stamp:
+            # Copied so set() on this instance can't alter the cached parse
+            self._data = copy.deepcopy(cached[1])
+            return
+
+        data = json.loads(self.config_path.read_bytes())
+        _PARSE_CACHE[self.config_path] = (stamp, data)
+        self._data = copy.deepcopy(data)
 
     def _save(self) -> None:
-        """Save config to disk."""
-        self.config_dir.mkdir(parents=True, exist_ok=True)
-        self.config_path.write_text(json.dumps(self._data, indent=2))
+        """Save config to disk.
+
+        Written to a temp file in the same directory and renamed over the
+        target, so a crash mid-write never leaves a truncated config behind.
+        """
+        if not self._dir_exists:
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+            self._dir_exists = True
+        payload = json.dumps(self._data, indent=2).encode()
+        with tempfile.NamedTemporaryFile(
+            dir=self.config_dir, prefix=".config-", suffix=".tmp", delete=False
+        ) as tmp:
+            tmp.write(payload)
+        try:
+            os.replace(tmp.name, self.config_path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+        _PARSE_CACHE.pop(self.config_path, None)
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get a config value using dot notation (e.g., 'peloton.username')."""
-        keys = key.split(".")
+        value = self._get_cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._lookup(key)
+            self._get_cache[key] = value
+        return default if value is _MISSING else value
+
+    def _lookup(self, key: str) -> Any:
+        """Walk _data for a dotted key, returning _MISSING if any step is absent."""
         value = self._data
-        for k in keys:
-            if isinstance(value, dict):
-                value = value.get(k)
-            else:
-                return default
+        for k in _split_key(key):
+            if not isinstance(value, dict):
+                return _MISSING
+            value = value.get(k)
             if value is None:
-                return default
+                return _MISSING
         return value
 
     def set(self, key: str, value: Any) -> None:
         """Set a config value using dot notation."""
-        keys = key.split(".")
+        keys = _split_key(key)
         data = self._data
         for k in keys[:-1]:
             if k not in data:
                 data[k] = {}
             data = data[k]
         data[keys[-1]] = value
+        # Any cached lookup may sit under (or above) the key just written
+        self._get_cache.clear()
+        if self._in_batch:
+            self._dirty = True
+            return
         self._save()
 
+    @contextmanager
+    def batch(self) -> Iterator["Config"]:
+        """Defer saving until the block exits, writing the file at most once.
+
+        If the block raises, nothing is saved and the in-memory config is
+        rolled back, so a half-applied set of changes never reaches disk.
+
+        Usage:
+            with config.batch():
+                config.set("peloton.username", "user")
+                config.set("peloton.password", "secret")
+        """
+        if self._in_batch:
+            # Nested batch: the outermost one does the save
+            yield self
+            return
+
+        snapshot = copy.deepcopy(self._data)
+        self._in_batch = True
+        try:
+            yield self
+        except BaseException:
+            self._data = snapshot
+            self._get_cache.clear()
+            raise
+        finally:
+            self._in_batch = False
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self._save()
+
     def get_db_path(self) -> Path:
         """Get the database path."""
         return Path(self.get("db_path", str(DEFAULT_DB_PATH)))
 
-    @property
+    @cached_property
     def data_dir(self) -> Path:
-        """Directory for storing imported data files."""
+        """Directory for storing imported data files, created on first access."""
         path = self.config_dir / "data"
         path.mkdir(parents=True, exist_ok=True)
         return path
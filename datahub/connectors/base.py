@@ -44,6 +44,11 @@ class BaseConnector(ABC):
 
     def _complete_sync(self, log: SyncLog, added: int, updated: int) -> None:
         """Record successful completion of a sync."""
+        # sync_logs tables created before the CHECK constraints don't enforce them
+        if added < 0 or updated < 0:
+            raise ValueError(
+                f"Negative record counts from {self.name}: {added} added, {updated} updated"
+            )
         log.completed_at = datetime.now(timezone.utc)
         log.status = "success"
         log.records_added = added
@@ -13,7 +13,9 @@ Usage:
 import csv
 import hashlib
 import json
+import re
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterator
 
@@ -21,7 +23,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from datahub.connectors.base import FileImportConnector
-from datahub.db import Transaction
+from datahub.db import Transaction, bulk_insert_transactions
 
 
 # Column mappings for known bank formats
@@ -56,38 +58,82 @@ BANK_FORMATS = {
 }
 
 
+# strptime's own field patterns. \d is Unicode-aware there too, so years and
+# the second digit of days 10-29 may be non-ASCII; months are ASCII only.
+_MONTH = r"1[0-2]|0[1-9]|[1-9]"
+_DAY = r"3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9]"
+# Matches every supported layout in one pass, in the order they used to be
+# tried: YYYY-MM-DD / YYYY/MM/DD (groups 1-4, separator must repeat),
+# MM/DD/YYYY / MM/DD/YY (groups 5-7), then DD/MM/YYYY (groups 8-10).
+_DATE_RE = re.compile(
+    rf"(\d{{4}})([-/])({_MONTH})\2({_DAY})"
+    rf"|({_MONTH})/({_DAY})/(\d{{4}}|\d{{2}})"
+    rf"|({_DAY})/({_MONTH})/(\d{{4}})"
+)
+
+
+@lru_cache(maxsize=4096)
 def parse_date(date_str: str) -> datetime:
-    """Parse common date formats from bank exports."""
-    formats = [
-        "%m/%d/%Y",
-        "%Y-%m-%d",
-        "%m/%d/%y",
-        "%d/%m/%Y",
-        "%Y/%m/%d",
-    ]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str.strip(), fmt)
-        except ValueError:
-            continue
-    raise ValueError(f"Could not parse date: {date_str}")
+    """Parse common date formats from bank exports.
+
+    Supports MM/DD/YYYY, YYYY-MM-DD, MM/DD/YY, DD/MM/YYYY and YYYY/MM/DD.
+    Slash dates are read month-first unless the first field can't be a month.
+    Results are cached: statements repeat the same few hundred dates.
+    """
+    match = _DATE_RE.fullmatch(date_str.strip())
+    if match is None:
+        raise ValueError(f"Could not parse date: {date_str}")
+
+    (
+        year_str, _, month_str, day_str,
+        md_month, md_day, md_year,
+        dm_day, dm_month, dm_year,
+    ) = match.groups()
+    if year_str is not None:
+        year, month, day = int(year_str), int(month_str), int(day_str)
+    elif md_month is not None:
+        month, day = int(md_month), int(md_day)
+        year = int(md_year)
+        if len(md_year) == 2:
+            # Same pivot as strptime's %y: 69-99 -> 1900s, 00-68 -> 2000s
+            year += 1900 if year >= 69 else 2000
+    else:
+        year, month, day = int(dm_year), int(dm_month), int(dm_day)
+
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        raise ValueError(f"Could not parse date: {date_str}") from None
+
+
+# Deletes currency symbols and thousands separators in a single pass
+_AMOUNT_STRIP_TABLE = str.maketrans("", "", "$,")
 
 
 def parse_amount(amount_str: str) -> float:
     """Parse amount string, handling currency symbols and parentheses for negatives."""
-    cleaned = amount_str.strip()
-    # Remove currency symbols
-    cleaned = cleaned.replace("$", "").replace(",", "")
+    cleaned = amount_str.strip().translate(_AMOUNT_STRIP_TABLE)
     # Handle parentheses for negatives: (100.00) -> -100.00
     if cleaned.startswith("(") and cleaned.endswith(")"):
         cleaned = "-" + cleaned[1:-1]
     return float(cleaned)
 
 
+# Fresh hasher state, copied per call; cheaper than constructing md5() each time
+_TXN_ID_HASHER = hashlib.md5(usedforsecurity=False)
+
+
 def generate_transaction_id(date: datetime, amount: float, description: str) -> str:
-    """Generate a unique ID for deduplication."""
+    """Generate a unique ID for deduplication.
+
+    The key and digest must stay stable: IDs are persisted as source_id and
+    compared against on every later import.
+    """
     content = f"{date.isoformat()}|{amount}|{description}"
-    return hashlib.md5(content.encode()).hexdigest()[:16]
+    hasher = _TXN_ID_HASHER.copy()
+    hasher.update(content.encode())
+    # Only the first 8 bytes are kept, so hex-encode just those
+    return hasher.digest()[:8].hex()
 
 
 class CSVBankConnector(FileImportConnector):
@@ -115,32 +161,63 @@ class CSVBankConnector(FileImportConnector):
 
         self.bank_format = bank_format
 
+        # Resolved once so per-row parsing doesn't go through the mapping
+        self._date_col = self.columns["date"]
+        self._amount_col = self.columns["amount"]
+        self._desc_col = self.columns["description"]
+        self._category_col = self.columns.get("category")
+        self._merchant_col = self.columns.get("merchant")
+
     def _iter_transactions(self, file_path: Path) -> Iterator[dict]:
         """Iterate over transactions in CSV file."""
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
+        date_col = self._date_col
+        amount_col = self._amount_col
+        desc_col = self._desc_col
+        category_col = self._category_col
+        merchant_col = self._merchant_col
+
+        # utf-8-sig drops a leading BOM if present; newline="" lets csv handle
+        # line endings and newlines inside quoted fields itself
+        with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+
+            # Map names to positions once; later duplicates win, as with DictReader
+            positions = {name: i for i, name in enumerate(header)}
+            if date_col not in positions or amount_col not in positions:
+                return
+
+            date_idx = positions[date_col]
+            amount_idx = positions[amount_col]
+            desc_idx = positions.get(desc_col)
+            category_idx = positions.get(category_col) if category_col else None
+            merchant_idx = positions.get(merchant_col) if merchant_col else None
 
             for row in reader:
+                if not row:
+                    continue
                 try:
-                    date_col = self.columns["date"]
-                    amount_col = self.columns["amount"]
-                    desc_col = self.columns["description"]
-
-                    if date_col not in row or amount_col not in row:
+                    date_str = row[date_idx]
+                    amount_str = row[amount_idx]
+                    # Blank required fields (summary or pending lines) are common;
+                    # skip them without raising through the parsers
+                    if not date_str or not amount_str:
                         continue
 
-                    date = parse_date(row[date_col])
-                    amount = parse_amount(row[amount_col])
-                    description = row.get(desc_col, "").strip()
+                    date = parse_date(date_str)
+                    amount = parse_amount(amount_str)
+                    description = row[desc_idx].strip() if desc_idx is not None else ""
 
                     # Get optional fields
                     category = None
-                    if self.columns.get("category") and self.columns["category"] in row:
-                        category = row[self.columns["category"]].strip() or None
+                    if category_idx is not None:
+                        category = row[category_idx].strip() or None
 
                     merchant = None
-                    if self.columns.get("merchant") and self.columns["merchant"] in row:
-                        merchant = row[self.columns["merchant"]].strip() or None
+                    if merchant_idx is not None:
+                        merchant = row[merchant_idx].strip() or None
 
                     yield {
                         "date": date,
@@ -148,54 +225,58 @@ class CSVBankConnector(FileImportConnector):
                         "description": description,
                         "category": category,
                         "merchant": merchant,
-                        "raw": dict(row),
+                        "header": header,
+                        "raw": row,
                     }
-                except (ValueError, KeyError) as e:
-                    # Skip malformed rows
+                except (ValueError, IndexError):
+                    # Skip malformed or short rows
                     continue
 
-    def _transaction_exists(self, source_id: str) -> bool:
-        """Check if transaction already exists."""
-        stmt = select(Transaction).where(Transaction.source_id == source_id)
-        return self.session.execute(stmt).first() is not None
+    def _existing_source_ids(self, start: datetime, end: datetime) -> set[str]:
+        """Load stored transaction IDs for the date range covered by an import."""
+        stmt = select(Transaction.source_id).where(
+            Transaction.date.between(start, end),
+            Transaction.source_id.is_not(None),
+        )
+        return set(self.session.scalars(stmt))
 
     def import_file(self, file_path: Path) -> tuple[int, int]:
         """Import transactions from CSV file."""
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        added = 0
-        skipped = 0
-        batch = []
-        batch_size = 500
+        txns = list(self._iter_transactions(file_path))
+        if not txns:
+            return 0, 0
 
-        for txn in self._iter_transactions(file_path):
-            source_id = generate_transaction_id(txn["date"], txn["amount"], txn["description"])
+        # One lookup for the whole file instead of one per row. Only rows stored
+        # before this import count as duplicates, so repeated identical rows
+        # within a single statement are all kept.
+        dates = [txn["date"] for txn in txns]
+        existing = self._existing_source_ids(min(dates), max(dates))
 
-            if self._transaction_exists(source_id):
-                skipped += 1
+        source = f"csv_{self.bank_format}"
+        new_rows = []
+        for txn in txns:
+            source_id = generate_transaction_id(txn["date"], txn["amount"], txn["description"])
+            if source_id in existing:
                 continue
+            new_rows.append({
+                "date": txn["date"],
+                "amount": txn["amount"],
+                "description": txn["description"],
+                "merchant": txn.get("merchant"),
+                "category": txn.get("category"),
+                "account": self.account_name,
+                "source": source,
+                "source_id": source_id,
+                # Raw row is only serialized for rows that are actually stored
+                "metadata_json": json.dumps(dict(zip(txn["header"], txn["raw"]))),
+            })
 
-            batch.append(Transaction(
-                date=txn["date"],
-                amount=txn["amount"],
-                description=txn["description"],
-                merchant=txn.get("merchant"),
-                category=txn.get("category"),
-                account=self.account_name,
-                source=f"csv_{self.bank_format}",
-                source_id=source_id,
-                metadata_json=json.dumps(txn["raw"]),
-            ))
-            added += 1
-
-            if len(batch) >= batch_size:
-                self.session.add_all(batch)
-                self.session.commit()
-                batch = []
-
-        if batch:
-            self.session.add_all(batch)
+        batch_size = 500
+        for start in range(0, len(new_rows), batch_size):
+            bulk_insert_transactions(self.session, new_rows[start:start + batch_size])
             self.session.commit()
 
-        return added, skipped
+        return len(new_rows), len(txns) - len(new_rows)
@@ -11,9 +11,9 @@ Strategy:
    data from times when only one device was active
 """
 
-from datetime import datetime, timedelta
-from collections import defaultdict
-from sqlalchemy import func, select, case, literal
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from sqlalchemy import and_, cast, func, select, case, literal, Integer
 from sqlalchemy.orm import Session
 
 from datahub.db import DataPoint
@@ -21,7 +21,7 @@ from datahub.db import DataPoint
 
 # Source priority by data type (higher number = higher priority)
 # Apple Watch is most accurate for activity, Oura for sleep/HRV
-SOURCE_PRIORITY = {
+_SOURCE_PRIORITY = {
     "steps": {
         "apple_watch": 100,
         "oura": 80,
@@ -58,14 +58,135 @@ SOURCE_PRIORITY = {
     },
 }
 
+# Read-only views, so the flattened lookup table below can't go stale
+SOURCE_PRIORITY = MappingProxyType({
+    data_type: MappingProxyType(sources)
+    for data_type, sources in _SOURCE_PRIORITY.items()
+})
+
+# (data_type, source) -> priority, so a lookup is a single dict get
+_FLAT_PRIORITY = {
+    (data_type, source): priority
+    for data_type, sources in _SOURCE_PRIORITY.items()
+    for source, priority in sources.items()
+}
+
 # Default priority for unknown sources/types
 DEFAULT_PRIORITY = 10
 
+# Seconds from 0001-01-01 to the Unix epoch (a whole number of days)
+_EPOCH_ORDINAL_SECONDS = (date(1970, 1, 1).toordinal() - 1) * 86400
+
 
 def get_source_priority(data_type: str, source: str) -> int:
     """Get the priority for a source for a given data type."""
-    type_priorities = SOURCE_PRIORITY.get(data_type, {})
-    return type_priorities.get(source, DEFAULT_PRIORITY)
+    return _FLAT_PRIORITY.get((data_type, source), DEFAULT_PRIORITY)
+
+
+def _priority_expr(data_type, source, data_types: list[str]):
+    """SQL CASE giving get_source_priority(data_type, source) for the given types."""
+    whens = [
+        (and_(data_type == dt, source == src), literal(priority))
+        for (dt, src), priority in _FLAT_PRIORITY.items()
+        if dt in data_types
+    ]
+    if not whens:
+        return literal(DEFAULT_PRIORITY)
+    return case(*whens, else_=literal(DEFAULT_PRIORITY))
+
+
+def _daily_totals_stmt(
+    data_types: list[str],
+    start_date: datetime,
+    end_date: datetime,
+    newest_first: bool = False,
+):
+    """SELECT of deduplicated (data_type, day, total) rows.
+
+    Each hour bucket counts only its highest priority source, and a day is
+    the sum of its hour buckets. Ordered by type and day, or by day
+    descending then type if newest_first.
+    """
+    # Let SQLite sum each (type, hour, source) group. Buckets are whole hours
+    # since 0001-01-01, read straight off the stored (naive) timestamps; the
+    # offset keeps them positive, as SQLite's integer division truncates.
+    seconds = cast(func.strftime("%s", DataPoint.timestamp), Integer) + _EPOCH_ORDINAL_SECONDS
+    bucket = (seconds // 3600).label("bucket")  # bucket // 24 is the day
+    groups = (
+        select(
+            DataPoint.data_type,
+            bucket,
+            DataPoint.source,
+            func.sum(DataPoint.value).label("total"),
+            func.min(DataPoint.timestamp).label("first_ts"),
+            func.min(DataPoint.id).label("first_id"),
+        )
+        .where(DataPoint.data_type.in_(data_types))
+        .where(DataPoint.timestamp >= start_date)
+        .where(DataPoint.timestamp <= end_date)
+        .group_by(DataPoint.data_type, bucket, DataPoint.source)
+        .subquery()
+    )
+
+    # Rank the sources within each (type, hour bucket): highest priority first,
+    # then whichever reported first, as in a timestamp-ordered scan.
+    priority = _priority_expr(groups.c.data_type, groups.c.source, data_types)
+    ranked = select(
+        groups.c.data_type,
+        groups.c.bucket,
+        groups.c.total,
+        func.row_number().over(
+            partition_by=(groups.c.data_type, groups.c.bucket),
+            order_by=(priority.desc(), groups.c.first_ts, groups.c.first_id),
+        ).label("rn"),
+    ).subquery()
+
+    # Sum the winning sources by type and day (proleptic Gregorian ordinal, minus one)
+    day = (ranked.c.bucket // 24).label("day")
+    return (
+        select(ranked.c.data_type, day, func.sum(ranked.c.total).label("total"))
+        .where(ranked.c.rn == 1)
+        .group_by(ranked.c.data_type, day)
+        .order_by(
+            *((day.desc(), ranked.c.data_type) if newest_first else (ranked.c.data_type, day))
+        )
+    )
+
+
+def fetch_daily_totals_bulk(
+    session: Session,
+    data_types: list[str],
+    start_date: datetime,
+    end_date: datetime | None = None,
+    newest_first: bool = False,
+) -> dict[tuple[str, str], float]:
+    """
+    Get deduplicated daily totals for several data types in one query.
+
+    Groups records by type, hour and source, ranks the sources of each hour
+    by priority and sums the winners into daily totals, all in one SQL query.
+
+    Args:
+        session: Database session
+        data_types: The data types to query (e.g., ["steps", "hrv"])
+        start_date: Start of date range
+        end_date: End of date range (defaults to now)
+        newest_first: Order by date descending, then type, instead of key order
+
+    Returns:
+        Dict mapping (data_type, ISO date) to the day's total, in key order
+        unless newest_first is set
+    """
+    if end_date is None:
+        end_date = datetime.now()
+
+    stmt = _daily_totals_stmt(data_types, start_date, end_date, newest_first)
+
+    # Format each day's date once
+    return {
+        (data_type, date.fromordinal(day + 1).isoformat()): total
+        for data_type, day, total in session.execute(stmt)
+    }
 
 
 def deduplicate_daily_totals(
@@ -77,8 +198,8 @@ def deduplicate_daily_totals(
     """
     Get deduplicated daily totals for a data type.
 
-    Groups records by hour, picks the highest priority source for each hour,
-    then sums to get daily totals.
+    Groups records by hour and source in SQL, picks the highest priority
+    source for each hour, then sums to get daily totals.
 
     Args:
         session: Database session
@@ -89,62 +210,54 @@ def deduplicate_daily_totals(
     Returns:
         List of dicts with 'date' and 'total' keys
     """
+    totals = fetch_daily_totals_bulk(session, [data_type], start_date, end_date)
+    return [{"date": day, "total": total} for (_, day), total in totals.items()]
+
+
+def daily_calories_merged(
+    session: Session,
+    start_date: datetime,
+    end_date: datetime | None = None,
+) -> list[dict]:
+    """
+    Get deduplicated daily active and resting calories side by side.
+
+    Both types are pivoted onto one row per day in SQL. Days without active
+    calories are left out; a missing resting total counts as zero.
+
+    Args:
+        session: Database session
+        start_date: Start of date range
+        end_date: End of date range (defaults to now)
+
+    Returns:
+        List of dicts with 'date', 'active', 'resting' and 'total' keys
+    """
     if end_date is None:
         end_date = datetime.now()
 
-    # Fetch all records in the date range
+    daily = _daily_totals_stmt(
+        ["active_calories", "resting_calories"], start_date, end_date
+    ).subquery()
+    active = func.sum(case((daily.c.data_type == "active_calories", daily.c.total)))
+    resting = func.coalesce(
+        func.sum(case((daily.c.data_type == "resting_calories", daily.c.total))), 0.0
+    )
     stmt = (
-        select(DataPoint)
-        .where(DataPoint.data_type == data_type)
-        .where(DataPoint.timestamp >= start_date)
-        .where(DataPoint.timestamp <= end_date)
-        .order_by(DataPoint.timestamp)
+        select(daily.c.day, active, resting)
+        .group_by(daily.c.day)
+        .having(active.is_not(None))
+        .order_by(daily.c.day)
     )
 
-    records = list(session.execute(stmt).scalars())
-
-    if not records:
-        return []
-
-    # Group by hour bucket, keeping only highest priority source per bucket
-    # bucket_key = (date, hour)
-    hourly_buckets: dict[tuple, dict] = {}
-
-    for record in records:
-        date = record.timestamp.date()
-        hour = record.timestamp.hour
-        bucket_key = (date, hour)
-
-        priority = get_source_priority(data_type, record.source)
-
-        if bucket_key not in hourly_buckets:
-            hourly_buckets[bucket_key] = {
-                "source": record.source,
-                "priority": priority,
-                "value": record.value,
-            }
-        else:
-            existing = hourly_buckets[bucket_key]
-            if priority > existing["priority"]:
-                # Higher priority source - replace
-                hourly_buckets[bucket_key] = {
-                    "source": record.source,
-                    "priority": priority,
-                    "value": record.value,
-                }
-            elif priority == existing["priority"] and record.source == existing["source"]:
-                # Same source - accumulate (multiple records in same hour from same source)
-                existing["value"] += record.value
-
-    # Sum by day
-    daily_totals: dict[str, float] = defaultdict(float)
-    for (date, hour), data in hourly_buckets.items():
-        daily_totals[str(date)] += data["value"]
-
-    # Sort and return
     return [
-        {"date": date, "total": total}
-        for date, total in sorted(daily_totals.items())
+        {
+            "date": date.fromordinal(day + 1).isoformat(),
+            "active": active_total,
+            "resting": resting_total,
+            "total": active_total + resting_total,
+        }
+        for day, active_total, resting_total in session.execute(stmt)
     ]
 
 
@@ -188,10 +301,13 @@ def get_daily_average(
     Returns:
         Average daily value
     """
-    daily = deduplicate_daily_totals(session, data_type, start_date, end_date)
-    if not daily:
-        return 0.0
-    return sum(d["total"] for d in daily) / len(daily)
+    if end_date is None:
+        end_date = datetime.now()
+
+    # Averaged in SQL, so only the one number comes back
+    daily = _daily_totals_stmt([data_type], start_date, end_date).subquery()
+    average = session.execute(select(func.avg(daily.c.total))).scalar()
+    return average if average is not None else 0.0
 
 
 def deduplicate_records_by_priority(
@@ -217,48 +333,42 @@ def deduplicate_records_by_priority(
     if end_date is None:
         end_date = datetime.now()
 
+    # Plain column rows are enough here; no need to build DataPoint objects.
+    # Buckets stay in Python: they are epoch offsets in local time, which
+    # SQLite's UTC-based strftime('%s') would not reproduce.
     stmt = (
-        select(DataPoint)
+        select(DataPoint.timestamp, DataPoint.source, DataPoint.value, DataPoint.unit)
         .where(DataPoint.data_type == data_type)
         .where(DataPoint.timestamp >= start_date)
         .where(DataPoint.timestamp <= end_date)
         .order_by(DataPoint.timestamp)
     )
 
-    records = list(session.execute(stmt).scalars())
+    # Running sum per (bucket, source), plus the winning source per bucket:
+    # highest priority, ties kept by whichever source appeared first.
+    # Rows are consumed straight off the cursor rather than collected first.
+    running: dict[tuple[int, str], float] = {}
+    best: dict[int, tuple] = {}
+
+    for timestamp, source, value, unit in session.execute(stmt):
+        # Calculate bucket index (minutes since epoch / bucket_minutes)
+        bucket_idx = int(timestamp.timestamp() / 60) // bucket_minutes
 
-    if not records:
-        return []
+        key = (bucket_idx, source)
+        running[key] = running.get(key, 0.0) + value
 
-    # Group by time bucket
-    buckets: dict[int, dict] = {}
+        priority = get_source_priority(data_type, source)
+        current = best.get(bucket_idx)
+        if current is None or priority > current[0]:
+            best[bucket_idx] = (priority, source, timestamp, unit)
 
-    for record in records:
-        # Calculate bucket index (minutes since epoch / bucket_minutes)
-        ts_minutes = int(record.timestamp.timestamp() / 60)
-        bucket_idx = ts_minutes // bucket_minutes
-
-        priority = get_source_priority(data_type, record.source)
-
-        if bucket_idx not in buckets:
-            buckets[bucket_idx] = {
-                "timestamp": record.timestamp,
-                "source": record.source,
-                "priority": priority,
-                "value": record.value,
-                "unit": record.unit,
-            }
-        else:
-            existing = buckets[bucket_idx]
-            if priority > existing["priority"]:
-                buckets[bucket_idx] = {
-                    "timestamp": record.timestamp,
-                    "source": record.source,
-                    "priority": priority,
-                    "value": record.value,
-                    "unit": record.unit,
-                }
-            elif priority == existing["priority"] and record.source == existing["source"]:
-                existing["value"] += record.value
-
-    return list(buckets.values())
+    return [
+        {
+            "timestamp": timestamp,
+            "source": source,
+            "priority": priority,
+            "value": running[(bucket_idx, source)],
+            "unit": unit,
+        }
+        for bucket_idx, (priority, source, timestamp, unit) in best.items()
+    ]
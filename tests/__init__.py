@@ -0,0 +1 @@
+"""DataHub test suite."""
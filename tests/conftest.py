@@ -1,28 +1,167 @@
 """Shared test fixtures for DataHub tests."""
 
-import sys
-from pathlib import Path
-
-# Add the project root to sys.path so the web module can be imported
-PROJECT_ROOT = Path(__file__).parent.parent
-if str(PROJECT_ROOT) not in sys.path:
-    sys.path.insert(0, str(PROJECT_ROOT))
+import json
+import shutil
+from unittest.mock import MagicMock
 
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from click.testing import CliRunner
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 
-from datahub.db import Base, DataPoint, Transaction, SyncLog, init_db
+from datahub.db import Base, DataPoint, Transaction, SyncLog, dispose_all, init_db
 from datahub.config import Config
 
 
-@pytest.fixture
+# Sample rows are built once at import and bulk-inserted by the fixtures below.
+_SAMPLE_DP_ROWS = (
+    dict(
+        timestamp=datetime(2024, 1, 15, 10, 0),
+        data_type="steps",
+        value=1000.0,
+        unit="count",
+        source="apple_watch",
+    ),
+    dict(
+        timestamp=datetime(2024, 1, 15, 10, 30),
+        data_type="steps",
+        value=500.0,
+        unit="count",
+        source="apple_health",
+    ),
+    dict(
+        timestamp=datetime(2024, 1, 15, 11, 0),
+        data_type="steps",
+        value=800.0,
+        unit="count",
+        source="apple_watch",
+    ),
+    dict(
+        timestamp=datetime(2024, 1, 16, 9, 0),
+        data_type="steps",
+        value=1200.0,
+        unit="count",
+        source="apple_watch",
+    ),
+)
+
+_SAMPLE_TXN_ROWS = (
+    dict(
+        date=datetime(2024, 1, 15),
+        amount=-50.00,
+        description="Coffee Shop",
+        merchant="Starbucks",
+        category="Food & Drink",
+        source="chase_csv",
+    ),
+    dict(
+        date=datetime(2024, 1, 16),
+        amount=-125.50,
+        description="Grocery Store",
+        merchant="Whole Foods",
+        category="Groceries",
+        source="chase_csv",
+    ),
+    dict(
+        date=datetime(2024, 1, 17),
+        amount=25.00,
+        description="Refund",
+        merchant="Amazon",
+        category="Shopping",
+        source="chase_csv",
+    ),
+)
+
+_SAMPLE_WORKOUT_ROWS = (
+    dict(
+        timestamp=datetime(2024, 1, 15, 8, 0),
+        data_type="workout",
+        value=45.0,
+        unit="minutes",
+        source="peloton",
+        metadata_json=json.dumps({"type": "cycling", "calories": 450}),
+    ),
+    dict(
+        timestamp=datetime(2024, 1, 16, 7, 30),
+        data_type="strength_workout",
+        value=60.0,
+        unit="minutes",
+        source="tonal",
+        metadata_json=json.dumps({
+            "workout_name": "Upper Body",
+            "total_volume": 12500,
+            "exercises": 8,
+        }),
+    ),
+    dict(
+        timestamp=datetime(2024, 1, 17, 9, 0),
+        data_type="workout",
+        value=30.0,
+        unit="minutes",
+        source="peloton",
+        metadata_json=json.dumps({"type": "running", "calories": 320}),
+    ),
+)
+
+_SAMPLE_VOLUME_ROWS = (
+    dict(
+        timestamp=datetime(2024, 1, 16, 7, 30),
+        data_type="volume",
+        value=12500.0,
+        unit="lbs",
+        source="tonal",
+    ),
+    dict(
+        timestamp=datetime(2024, 1, 18, 8, 0),
+        data_type="volume",
+        value=15000.0,
+        unit="lbs",
+        source="tonal",
+    ),
+)
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    """Skip fsync and on-disk journaling; test databases are throwaway."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _disable_pysqlite_transactions(dbapi_conn, connection_record):
+    """Stop pysqlite from issuing its own BEGIN so SAVEPOINTs nest correctly."""
+    dbapi_conn.isolation_level = None
+
+
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _preload_cli():
+    """Import datahub.cli and its dependencies once per worker at session start.
+
+    Otherwise the first test to patch datahub.cli pays for the import.
+    """
+    import datahub.cli  # noqa: F401
+
+
+@pytest.fixture(scope="session")
 def test_engine():
-    """In-memory SQLite database engine for testing."""
+    """In-memory SQLite database engine, created once per session.
+
+    Tests must go through test_session, whose rollback keeps the shared
+    database empty between tests; committing on the engine directly would leak.
+    """
     engine = create_engine("sqlite:///:memory:")
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    event.listen(engine, "connect", _disable_pysqlite_transactions)
+    event.listen(engine, "begin", _emit_begin)
     Base.metadata.create_all(engine)
     yield engine
     engine.dispose()
@@ -30,12 +169,28 @@ def test_engine():
 
 @pytest.fixture
 def test_session(test_engine) -> Session:
-    """Database session with automatic rollback."""
-    SessionLocal = sessionmaker(bind=test_engine)
-    session = SessionLocal()
+    """Database session rolled back to a clean state after each test.
+
+    The session joins an outer transaction on a dedicated connection, so
+    commit() calls in fixtures and tests only release SAVEPOINTs and the
+    final rollback discards everything.
+    """
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
     yield session
-    session.rollback()
     session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope="session")
+def now() -> datetime:
+    """Wall-clock time captured once per session for seeding relative dates.
+
+    This stays the real time because the CLI filters relative to datetime.now().
+    """
+    return datetime.now()
 
 
 @pytest.fixture
@@ -48,209 +203,242 @@ def temp_config(tmp_path) -> Config:
 @pytest.fixture
 def sample_datapoints(test_session) -> list[DataPoint]:
     """Create sample DataPoints for testing."""
-    points = [
-        DataPoint(
-            timestamp=datetime(2024, 1, 15, 10, 0),
-            data_type="steps",
-            value=1000.0,
-            unit="count",
-            source="apple_watch",
-        ),
-        DataPoint(
-            timestamp=datetime(2024, 1, 15, 10, 30),
-            data_type="steps",
-            value=500.0,
-            unit="count",
-            source="apple_health",
-        ),
-        DataPoint(
-            timestamp=datetime(2024, 1, 15, 11, 0),
-            data_type="steps",
-            value=800.0,
-            unit="count",
-            source="apple_watch",
-        ),
-        DataPoint(
-            timestamp=datetime(2024, 1, 16, 9, 0),
-            data_type="steps",
-            value=1200.0,
-            unit="count",
-            source="apple_watch",
-        ),
-    ]
-    test_session.add_all(points)
+    test_session.bulk_insert_mappings(DataPoint, _SAMPLE_DP_ROWS)
     test_session.commit()
-    return points
+    return test_session.query(DataPoint).filter(DataPoint.data_type == "steps").order_by(DataPoint.id).all()
 
 
 @pytest.fixture
 def sample_transactions(test_session) -> list[Transaction]:
     """Create sample Transactions for testing."""
-    transactions = [
-        Transaction(
-            date=datetime(2024, 1, 15),
-            amount=-50.00,
-            description="Coffee Shop",
-            merchant="Starbucks",
-            category="Food & Drink",
-            source="chase_csv",
-        ),
-        Transaction(
-            date=datetime(2024, 1, 16),
-            amount=-125.50,
-            description="Grocery Store",
-            merchant="Whole Foods",
-            category="Groceries",
-            source="chase_csv",
-        ),
-        Transaction(
-            date=datetime(2024, 1, 17),
-            amount=25.00,
-            description="Refund",
-            merchant="Amazon",
-            category="Shopping",
-            source="chase_csv",
-        ),
-    ]
-    test_session.add_all(transactions)
+    test_session.bulk_insert_mappings(Transaction, _SAMPLE_TXN_ROWS)
     test_session.commit()
-    return transactions
+    return test_session.query(Transaction).order_by(Transaction.id).all()
 
 
 @pytest.fixture
-def web_test_db(tmp_path):
-    """Create a file-based test database for web tests."""
-    # Create a file-based test database to avoid threading issues
-    test_db_path = tmp_path / "web_test.db"
-    init_db(test_db_path)
-
-    # Create engine with check_same_thread=False for SQLite
+def web_test_db():
+    """Create an in-memory test database for web tests."""
+    # StaticPool hands every checkout the same connection, so the app (running
+    # in TestClient's worker thread) and the test body see the same database.
     test_engine = create_engine(
-        f"sqlite:///{test_db_path}",
-        connect_args={"check_same_thread": False}
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
     )
+    event.listen(test_engine, "connect", _set_sqlite_pragmas)
+    Base.metadata.create_all(test_engine)
     TestSessionLocal = sessionmaker(bind=test_engine)
 
-    yield test_engine, TestSessionLocal
+    # No dispose(): the pool holds a single in-memory connection that is
+    # released along with the engine when the fixture value is dropped.
+    return test_engine, TestSessionLocal
 
-    test_engine.dispose()
+
+@pytest.fixture
+def web_session(web_test_db) -> Session:
+    """Session on the web test database, the one test_client's app reads."""
+    _, TestSessionLocal = web_test_db
+    session = TestSessionLocal()
+    yield session
+    session.close()
 
 
 @pytest.fixture
-def test_client(web_test_db):
-    """FastAPI TestClient with test database."""
-    import importlib.util
-    import sys
+def web_samples(web_session):
+    """Insert the sample rows above into the web test database, by name.
 
-    from starlette.testclient import TestClient
+    Usage: web_samples("datapoints", "transactions")
+    """
+    samples = {
+        "datapoints": (DataPoint, _SAMPLE_DP_ROWS),
+        "transactions": (Transaction, _SAMPLE_TXN_ROWS),
+        "workouts": (DataPoint, _SAMPLE_WORKOUT_ROWS),
+        "volume": (DataPoint, _SAMPLE_VOLUME_ROWS),
+    }
 
-    test_engine, TestSessionLocal = web_test_db
+    def seed(*names: str) -> None:
+        for name in names:
+            model, rows = samples[name]
+            web_session.bulk_insert_mappings(model, rows)
+        web_session.commit()
 
-    # Use spec_from_file_location to load the web module directly
-    web_init_path = PROJECT_ROOT / "web" / "__init__.py"
-    web_app_path = PROJECT_ROOT / "web" / "app.py"
+    return seed
 
-    # Load web package
-    spec = importlib.util.spec_from_file_location("web", web_init_path)
-    web_pkg = importlib.util.module_from_spec(spec)
-    sys.modules["web"] = web_pkg
-    spec.loader.exec_module(web_pkg)
 
-    # Load web.app module
-    spec = importlib.util.spec_from_file_location("web.app", web_app_path)
-    web_app_module = importlib.util.module_from_spec(spec)
-    sys.modules["web.app"] = web_app_module
-    spec.loader.exec_module(web_app_module)
+@pytest.fixture(scope="module")
+def _web_app_module():
+    """The web.app module, importable via pytest's pythonpath setting."""
+    import web.app
 
-    app = web_app_module.app
+    return web.app
 
-    # Monkey-patch get_db to use the test database
-    def test_get_db():
-        return TestSessionLocal()
 
-    original_get_db = web_app_module.get_db
-    web_app_module.get_db = test_get_db
+@pytest.fixture(scope="module")
+def _module_test_client(_web_app_module):
+    """A single TestClient shared by every test in a module."""
+    from starlette.testclient import TestClient
+
+    return TestClient(_web_app_module.app)
+
+
+@pytest.fixture
+def test_client(web_test_db, _web_app_module, _module_test_client):
+    """FastAPI TestClient with test database."""
+    _, TestSessionLocal = web_test_db
 
-    client = TestClient(app)
-    yield client
+    def override_get_db():
+        session = TestSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
 
-    # Restore the original get_db function
-    web_app_module.get_db = original_get_db
+    app = _web_app_module.app
+    app.dependency_overrides[_web_app_module.get_db] = override_get_db
+    _web_app_module._DASHBOARD_CACHE.clear()
+    try:
+        yield _module_test_client
+    finally:
+        app.dependency_overrides.clear()
 
 
 @pytest.fixture
+def mock_config(monkeypatch) -> MagicMock:
+    """MagicMock returned by every Config() call in datahub.cli.
+
+    Tests set attributes such as ``get_db_path.return_value`` directly.
+    """
+    config = MagicMock()
+    monkeypatch.setattr("datahub.cli.Config", lambda: config)
+    return config
+
+
+@pytest.fixture(scope="session")
 def cli_runner():
-    """Click CLI test runner."""
+    """Click CLI test runner; it keeps no state between invokes, so one is shared."""
     return CliRunner()
 
 
+@pytest.fixture(scope="session")
+def cli_help() -> dict[str, str]:
+    """Help text for the top-level command groups, rendered once per session.
+
+    Built from click Contexts with get_help(), so no runner or I/O capture is set up.
+    """
+    import click
+
+    from datahub.cli import cli
+
+    root = click.Context(cli, info_name="datahub")
+
+    def render(*path: str) -> str:
+        ctx = root
+        for name in path:
+            ctx = click.Context(ctx.command.commands[name], info_name=name, parent=ctx)
+        return ctx.get_help()
+
+    return {
+        "main": render(),
+        "import": render("import-data"),
+        "sync": render("sync"),
+        "bank_csv": render("import-data", "bank-csv"),
+    }
+
+
+@pytest.fixture(scope="session")
+def scratch(tmp_path_factory):
+    """Session-wide directory for throwaway output files; callers pick unique names."""
+    return tmp_path_factory.mktemp("scratch")
+
+
+@pytest.fixture(scope="session")
+def _db_template(tmp_path_factory):
+    """Schema-initialized SQLite file, created once and copied per test."""
+    template_path = tmp_path_factory.mktemp("db_template") / "template.db"
+    init_db(template_path)
+    # Closing the pool checkpoints the WAL, so the schema is in the file we copy
+    dispose_all()
+    return template_path
+
+
 @pytest.fixture
-def initialized_db(tmp_path, temp_config):
-    """Database initialized and ready for CLI tests."""
+def fresh_db(tmp_path, _db_template):
+    """Path to a per-test copy of the schema-initialized template database."""
     db_path = tmp_path / "test.db"
-    init_db(db_path)
-    temp_config.set("db_path", str(db_path))
+    shutil.copyfile(_db_template, db_path)
+    yield db_path
+    # Code under test may have cached an engine for this file; close its pool
+    dispose_all()
+
+
+@pytest.fixture
+def seed_session(fresh_db) -> Session:
+    """Session on fresh_db for seeding test data, with fsync and disk journaling off."""
+    engine = create_engine(f"sqlite:///{fresh_db}")
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture(scope="class")
+def export_db(tmp_path_factory, _db_template, now):
+    """Database seeded once per class with steps and heart_rate rows.
+
+    Only for tests that read without writing, such as the export tests.
+    """
+    db_path = tmp_path_factory.mktemp("export_db") / "test.db"
+    shutil.copyfile(_db_template, db_path)
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    with Session(engine) as session:
+        session.execute(insert(DataPoint), [
+            dict(
+                timestamp=now - timedelta(days=1),
+                data_type="steps",
+                value=5000.0,
+                source="test",
+            ),
+            dict(
+                timestamp=now - timedelta(days=1),
+                data_type="heart_rate",
+                value=72.0,
+                unit="bpm",
+                source="test",
+            ),
+        ])
+        session.commit()
+    engine.dispose()
+
     return db_path
 
 
+@pytest.fixture
+def initialized_db(fresh_db, temp_config):
+    """Database initialized and ready for CLI tests."""
+    temp_config.set("db_path", str(fresh_db))
+    return fresh_db
+
+
 @pytest.fixture
 def sample_workouts(test_session) -> list[DataPoint]:
     """Create sample workout DataPoints for testing."""
-    import json
-    workouts = [
-        DataPoint(
-            timestamp=datetime(2024, 1, 15, 8, 0),
-            data_type="workout",
-            value=45.0,
-            unit="minutes",
-            source="peloton",
-            metadata_json=json.dumps({"type": "cycling", "calories": 450}),
-        ),
-        DataPoint(
-            timestamp=datetime(2024, 1, 16, 7, 30),
-            data_type="strength_workout",
-            value=60.0,
-            unit="minutes",
-            source="tonal",
-            metadata_json=json.dumps({
-                "workout_name": "Upper Body",
-                "total_volume": 12500,
-                "exercises": 8,
-            }),
-        ),
-        DataPoint(
-            timestamp=datetime(2024, 1, 17, 9, 0),
-            data_type="workout",
-            value=30.0,
-            unit="minutes",
-            source="peloton",
-            metadata_json=json.dumps({"type": "running", "calories": 320}),
-        ),
-    ]
-    test_session.add_all(workouts)
+    test_session.bulk_insert_mappings(DataPoint, _SAMPLE_WORKOUT_ROWS)
     test_session.commit()
-    return workouts
+    return (
+        test_session.query(DataPoint)
+        .filter(DataPoint.data_type.in_(["workout", "strength_workout"]))
+        .order_by(DataPoint.id)
+        .all()
+    )
 
 
 @pytest.fixture
 def sample_volume(test_session) -> list[DataPoint]:
     """Create sample volume DataPoints for testing (Tonal strength metrics)."""
-    volumes = [
-        DataPoint(
-            timestamp=datetime(2024, 1, 16, 7, 30),
-            data_type="volume",
-            value=12500.0,
-            unit="lbs",
-            source="tonal",
-        ),
-        DataPoint(
-            timestamp=datetime(2024, 1, 18, 8, 0),
-            data_type="volume",
-            value=15000.0,
-            unit="lbs",
-            source="tonal",
-        ),
-    ]
-    test_session.add_all(volumes)
+    test_session.bulk_insert_mappings(DataPoint, _SAMPLE_VOLUME_ROWS)
     test_session.commit()
-    return volumes
+    return test_session.query(DataPoint).filter(DataPoint.data_type == "volume").order_by(DataPoint.id).all()
@@ -1,5 +1,7 @@
 """Tests for Apple Health XML import connector."""
 
+import io
+
 import pytest
 from datetime import datetime
 from pathlib import Path
@@ -38,6 +40,17 @@ class TestParseAppleDate:
         result = parse_apple_date("2024-01-15 23:59:59 -0500")
         assert result == datetime(2024, 1, 15, 23, 59, 59)
 
+    @pytest.mark.parametrize("date_str", [
+        "2024-01-15",
+        "2024-01-15T08:30:00",
+        "20240115T083000",
+        "2024-01-15 08:30",
+    ])
+    def test_non_apple_formats_raise_error(self, date_str):
+        """Dates not in the Apple layout should be rejected, not guessed at."""
+        with pytest.raises(ValueError):
+            parse_apple_date(date_str)
+
 
 class TestGetSourceName:
     """Tests for get_source_name function."""
@@ -190,7 +203,7 @@ class TestAppleHealthConnector:
         assert datapoint.unit == "count"
         assert datapoint.source == "apple_watch"
 
-    def test_import_heart_rate_records(self, test_session, tmp_path):
+    def test_import_heart_rate_records(self, test_session):
         """Should import heart rate records."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -203,11 +216,8 @@ class TestAppleHealthConnector:
           endDate="2024-01-15 14:30:05 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, skipped = connector.import_file(xml_file)
+        added, skipped = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         assert added == 1
 
@@ -216,7 +226,7 @@ class TestAppleHealthConnector:
         assert datapoint.value == 72.0
         assert datapoint.unit == "count/min"
 
-    def test_import_workout_records(self, test_session, tmp_path):
+    def test_import_workout_records(self, test_session):
         """Should import workout records."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -231,11 +241,8 @@ class TestAppleHealthConnector:
            endDate="2024-01-15 06:30:30 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, skipped = connector.import_file(xml_file)
+        added, skipped = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         assert added == 1
 
@@ -246,7 +253,7 @@ class TestAppleHealthConnector:
         # Check metadata stored correctly
         assert "Running" in datapoint.metadata_json
 
-    def test_import_multiple_records(self, test_session, tmp_path):
+    def test_import_multiple_records(self, test_session):
         """Should import multiple records of different types."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -264,11 +271,8 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 10:00:00 -0500" endDate="2024-01-15 10:15:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, skipped = connector.import_file(xml_file)
+        added, skipped = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         assert added == 3
         assert skipped == 0
@@ -280,7 +284,7 @@ class TestAppleHealthConnector:
         assert "heart_rate" in data_types
         assert "active_calories" in data_types
 
-    def test_duplicate_prevention(self, test_session, tmp_path):
+    def test_duplicate_prevention(self, test_session):
         """Should skip duplicate records on reimport."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -290,18 +294,15 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 10:00:00 -0500" endDate="2024-01-15 10:15:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
 
         # First import
-        added1, skipped1 = connector.import_file(xml_file)
+        added1, skipped1 = connector.import_stream(io.BytesIO(xml_content.encode()))
         assert added1 == 1
         assert skipped1 == 0
 
         # Second import (same data)
-        added2, skipped2 = connector.import_file(xml_file)
+        added2, skipped2 = connector.import_stream(io.BytesIO(xml_content.encode()))
         assert added2 == 0
         assert skipped2 == 1
 
@@ -309,7 +310,7 @@ class TestAppleHealthConnector:
         count = test_session.query(DataPoint).count()
         assert count == 1
 
-    def test_ignores_unsupported_record_types(self, test_session, tmp_path):
+    def test_ignores_unsupported_record_types(self, test_session):
         """Should ignore record types not in HEALTH_TYPE_MAP."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -323,16 +324,13 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 10:00:00 -0500" endDate="2024-01-15 10:15:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, skipped = connector.import_file(xml_file)
+        added, skipped = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         # Only the supported step count should be imported
         assert added == 1
 
-    def test_source_detection_oura(self, test_session, tmp_path):
+    def test_source_detection_oura(self, test_session):
         """Should correctly identify Oura as source."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -342,16 +340,13 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 06:00:00 -0500" endDate="2024-01-15 06:00:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        connector.import_file(xml_file)
+        connector.import_stream(io.BytesIO(xml_content.encode()))
 
         datapoint = test_session.query(DataPoint).first()
         assert datapoint.source == "oura"
 
-    def test_source_detection_peloton(self, test_session, tmp_path):
+    def test_source_detection_peloton(self, test_session):
         """Should correctly identify Peloton as source."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -361,16 +356,13 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 07:00:00 -0500" endDate="2024-01-15 07:30:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        connector.import_file(xml_file)
+        connector.import_stream(io.BytesIO(xml_content.encode()))
 
         datapoint = test_session.query(DataPoint).first()
         assert datapoint.source == "peloton"
 
-    def test_handles_malformed_value(self, test_session, tmp_path):
+    def test_handles_malformed_value(self, test_session):
         """Should skip records with non-numeric values."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -384,16 +376,13 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 11:00:00 -0500" endDate="2024-01-15 11:15:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, skipped = connector.import_file(xml_file)
+        added, skipped = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         # Only the valid record should be imported
         assert added == 1
 
-    def test_workout_metadata_stored(self, test_session, tmp_path):
+    def test_workout_metadata_stored(self, test_session):
         """Should store workout metadata correctly."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -408,11 +397,8 @@ class TestAppleHealthConnector:
            endDate="2024-01-15 08:45:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        connector.import_file(xml_file)
+        connector.import_stream(io.BytesIO(xml_content.encode()))
 
         datapoint = test_session.query(DataPoint).first()
         assert datapoint is not None
@@ -420,22 +406,19 @@ class TestAppleHealthConnector:
         assert "500.0" in datapoint.metadata_json or "500" in datapoint.metadata_json
         assert datapoint.source == "peloton"
 
-    def test_empty_xml_file(self, test_session, tmp_path):
+    def test_empty_xml_file(self, test_session):
         """Should handle empty XML file."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
 </HealthData>"""
 
-        xml_file = tmp_path / "empty.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, skipped = connector.import_file(xml_file)
+        added, skipped = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         assert added == 0
         assert skipped == 0
 
-    def test_hrv_import(self, test_session, tmp_path):
+    def test_hrv_import(self, test_session):
         """Should import HRV data correctly."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -445,11 +428,8 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 23:00:00 -0500" endDate="2024-01-15 23:00:05 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, _ = connector.import_file(xml_file)
+        added, _ = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         assert added == 1
         datapoint = test_session.query(DataPoint).first()
@@ -457,7 +437,7 @@ class TestAppleHealthConnector:
         assert datapoint.value == 55.5
         assert datapoint.unit == "ms"
 
-    def test_sleep_import(self, test_session, tmp_path):
+    def test_sleep_import(self, test_session):
         """Should import sleep data correctly."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
 <HealthData>
@@ -467,11 +447,8 @@ class TestAppleHealthConnector:
           startDate="2024-01-15 22:00:00 -0500" endDate="2024-01-16 06:00:00 -0500"/>
 </HealthData>"""
 
-        xml_file = tmp_path / "export.xml"
-        xml_file.write_text(xml_content)
-
         connector = AppleHealthConnector(test_session)
-        added, _ = connector.import_file(xml_file)
+        added, _ = connector.import_stream(io.BytesIO(xml_content.encode()))
 
         assert added == 1
         datapoint = test_session.query(DataPoint).first()
@@ -1,5 +1,6 @@
 """Tests for CSV bank import connector."""
 
+import itertools
 import pytest
 from datetime import datetime
 from pathlib import Path
@@ -13,7 +14,7 @@ from datahub.connectors.finance.csv_import import (
     CSVBankConnector,
     BANK_FORMATS,
 )
-from datahub.db import Transaction
+from datahub.db import SyncLog, Transaction
 
 
 class TestParseDate:
@@ -49,6 +50,25 @@ class TestParseDate:
         result = parse_date("  01/15/2024  ")
         assert result == datetime(2024, 1, 15)
 
+    def test_single_digit_month_and_day(self):
+        """Should accept unpadded month and day fields."""
+        assert parse_date("1/5/2024") == datetime(2024, 1, 5)
+
+    def test_two_digit_year_pivot(self):
+        """Two-digit years 69-99 should map to the 1900s, like strptime's %y."""
+        assert parse_date("12/31/99") == datetime(1999, 12, 31)
+        assert parse_date("01/01/68") == datetime(2068, 1, 1)
+
+    def test_impossible_calendar_date_raises_error(self):
+        """Should raise ValueError for a date that matches a layout but doesn't exist."""
+        with pytest.raises(ValueError, match="Could not parse date"):
+            parse_date("02/30/2024")
+
+    def test_mixed_separators_raise_error(self):
+        """Year-first dates must use a single separator."""
+        with pytest.raises(ValueError, match="Could not parse date"):
+            parse_date("2024-01/15")
+
     def test_invalid_format_raises_error(self):
         """Should raise ValueError for unrecognized format."""
         with pytest.raises(ValueError, match="Could not parse date"):
@@ -59,6 +79,51 @@ class TestParseDate:
         with pytest.raises(ValueError, match="Could not parse date"):
             parse_date("")
 
+    def test_non_ascii_digits(self):
+        """Non-ASCII digits are accepted where strptime's patterns accept them."""
+        assert parse_date("\u0662\u0660\u0662\u0664-01-31") == datetime(2024, 1, 31)
+        assert parse_date("01/31/\u0662\u0660\u0662\u0664") == datetime(2024, 1, 31)
+        assert parse_date("01/1\u0665/24") == datetime(2024, 1, 15)
+        # The month field is ASCII-only in strptime
+        with pytest.raises(ValueError, match="Could not parse date"):
+            parse_date("\u0661\u0662/30/24")
+
+    def test_space_padded_day(self):
+        """A space-padded day should parse, as it does with strptime's %d."""
+        assert parse_date("1/ 5/2024") == datetime(2024, 1, 5)
+        assert parse_date("2024-01- 5") == datetime(2024, 1, 5)
+
+    def test_matches_strptime_formats(self):
+        """Should accept and reject exactly what the supported strptime formats do."""
+        formats = ["%m/%d/%Y", "%Y-%m-%d", "%m/%d/%y", "%d/%m/%Y", "%Y/%m/%d"]
+
+        def reference(date_str):
+            for fmt in formats:
+                try:
+                    return datetime.strptime(date_str.strip(), fmt)
+                except ValueError:
+                    continue
+            return None
+
+        fields = [
+            "", "0", "00", "1", "01", " 1", " 0", " 01", "  1", "9", "12", "13", "29", "30",
+            "31", "32", "123", "\u0661", "0\u0661", "1\u0665", "\u0661\u0662", "3\u0660",
+        ]
+        years = ["24", "99", "2024", "1999", "0000", "024", " 24", "\u0662\u0664", "\u0662\u0660\u0662\u0664"]
+        samples = set()
+        for a, b, year in itertools.product(fields, fields, years):
+            samples.add(f"{a}/{b}/{year}")
+            samples.add(f" {a}/{b}/{year} ")
+            samples.add(f"{year}-{a}-{b}")
+            samples.add(f"{year}/{a}/{b}")
+
+        for date_str in sorted(samples):
+            try:
+                result = parse_date(date_str)
+            except ValueError:
+                result = None
+            assert result == reference(date_str), date_str
+
 
 class TestParseAmount:
     """Tests for parse_amount function."""
@@ -125,6 +190,11 @@ class TestGenerateTransactionId:
         )
         assert len(result) == 16
 
+    def test_hash_is_stable_across_releases(self):
+        """IDs are stored for dedup, so the value for a given input must not change."""
+        result = generate_transaction_id(datetime(2024, 1, 15), -50.00, "Coffee Shop")
+        assert result == "722fb0e44b76ccab"
+
     def test_same_inputs_same_hash(self):
         """Same inputs should produce same hash."""
         date = datetime(2024, 1, 15)
@@ -232,6 +302,18 @@ class TestCSVBankConnector:
         with pytest.raises(FileNotFoundError, match="File not found"):
             connector.import_file(Path("/nonexistent/file.csv"))
 
+    def test_run_import_rejects_negative_counts(self, test_session, monkeypatch):
+        """A negative record count should fail the sync instead of being logged."""
+        connector = CSVBankConnector(test_session, bank_format="chase")
+        monkeypatch.setattr(connector, "import_file", lambda file_path: (-1, 0))
+
+        with pytest.raises(ValueError, match="Negative record counts"):
+            connector.run_import(Path("unused.csv"))
+
+        log = test_session.query(SyncLog).one()
+        assert log.status == "failed"
+        assert log.records_added == 0
+
     def test_import_chase_csv(self, test_session, tmp_path):
         """Should import Chase CSV format."""
         csv_content = """Transaction Date,Post Date,Description,Category,Type,Amount
@@ -346,6 +428,43 @@ class TestCSVBankConnector:
         transactions = test_session.query(Transaction).all()
         assert len(transactions) == 1
 
+    def test_repeated_rows_in_one_file_are_kept(self, test_session, tmp_path):
+        """Identical rows within one statement are separate purchases, not duplicates."""
+        csv_content = """Transaction Date,Post Date,Description,Category,Type,Amount
+01/15/2024,01/16/2024,STARBUCKS,Food & Drink,Sale,-5.50
+01/15/2024,01/16/2024,STARBUCKS,Food & Drink,Sale,-5.50"""
+
+        csv_file = tmp_path / "chase.csv"
+        csv_file.write_text(csv_content)
+
+        connector = CSVBankConnector(test_session, bank_format="chase")
+
+        added, skipped = connector.import_file(csv_file)
+        assert added == 2
+        assert skipped == 0
+
+        # Reimport skips both
+        added, skipped = connector.import_file(csv_file)
+        assert added == 0
+        assert skipped == 2
+
+    def test_duplicate_lookup_spans_file_date_range(self, test_session, tmp_path):
+        """Stored rows anywhere in the file's date range should be skipped."""
+        first = tmp_path / "january.csv"
+        first.write_text("""Transaction Date,Post Date,Description,Category,Type,Amount
+01/15/2024,01/16/2024,STARBUCKS,Food & Drink,Sale,-5.50""")
+        second = tmp_path / "february.csv"
+        second.write_text("""Transaction Date,Post Date,Description,Category,Type,Amount
+02/15/2024,02/16/2024,STARBUCKS,Food & Drink,Sale,-5.50
+01/15/2024,01/16/2024,STARBUCKS,Food & Drink,Sale,-5.50""")
+
+        connector = CSVBankConnector(test_session, bank_format="chase")
+        connector.import_file(first)
+
+        added, skipped = connector.import_file(second)
+        assert added == 1
+        assert skipped == 1
+
     def test_skips_malformed_rows(self, test_session, tmp_path):
         """Should skip rows with missing required fields."""
         csv_content = """Transaction Date,Post Date,Description,Category,Type,Amount
@@ -362,6 +481,23 @@ class TestCSVBankConnector:
         # Should import 2 valid rows, skip 1 malformed
         assert added == 2
 
+    def test_skips_truncated_rows(self, test_session, tmp_path):
+        """Should skip rows that end before the amount column."""
+        csv_content = """Transaction Date,Post Date,Description,Category,Type,Amount
+01/15/2024,01/16/2024,VALID ROW,Food & Drink,Sale,-5.50
+01/17/2024,01/18/2024,TRUNCATED
+
+01/18/2024,01/19/2024,ANOTHER VALID,Groceries,Sale,-25.00"""
+
+        csv_file = tmp_path / "chase.csv"
+        csv_file.write_text(csv_content)
+
+        connector = CSVBankConnector(test_session, bank_format="chase")
+        added, skipped = connector.import_file(csv_file)
+
+        assert added == 2
+        assert skipped == 0
+
     def test_handles_bom_encoding(self, test_session, tmp_path):
         """Should handle UTF-8 BOM encoding."""
         csv_content = """Transaction Date,Post Date,Description,Category,Type,Amount
@@ -376,6 +512,23 @@ class TestCSVBankConnector:
 
         assert added == 1
 
+    def test_handles_crlf_and_quoted_newlines(self, test_session, tmp_path):
+        """Should keep newlines inside quoted fields with Windows line endings."""
+        csv_content = (
+            "Transaction Date,Post Date,Description,Category,Type,Amount\r\n"
+            '01/15/2024,01/16/2024,"STARBUCKS\r\nSTORE 42",Food & Drink,Sale,-5.50\r\n'
+        )
+
+        csv_file = tmp_path / "chase_crlf.csv"
+        csv_file.write_bytes(csv_content.encode("utf-8"))
+
+        connector = CSVBankConnector(test_session, bank_format="chase")
+        added, skipped = connector.import_file(csv_file)
+
+        assert added == 1
+        txn = test_session.query(Transaction).first()
+        assert txn.description == "STARBUCKS\r\nSTORE 42"
+
     def test_stores_raw_metadata(self, test_session, tmp_path):
         """Should store raw row data in metadata_json."""
         csv_content = """Transaction Date,Post Date,Description,Category,Type,Amount
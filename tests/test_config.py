@@ -1,5 +1,6 @@
 """Tests for configuration management."""
 
+import os
 import pytest
 import json
 from pathlib import Path
@@ -117,6 +118,19 @@ class TestConfigSet:
 
         assert temp_config._data["peloton"]["username"] == "new_user"
 
+    def test_get_after_set_sees_new_value(self, temp_config):
+        """Lookups made before a set() should not be served stale afterwards."""
+        temp_config.set("peloton.username", "old_user")
+        assert temp_config.get("peloton.username") == "old_user"
+        assert temp_config.get("peloton.password") is None
+
+        temp_config.set("peloton.username", "new_user")
+        temp_config.set("peloton.password", "secret")
+
+        assert temp_config.get("peloton.username") == "new_user"
+        assert temp_config.get("peloton.password") == "secret"
+        assert temp_config.get("peloton") == {"username": "new_user", "password": "secret"}
+
     def test_preserves_sibling_keys(self, temp_config):
         """Setting nested key should preserve sibling keys."""
         temp_config._data = {"peloton": {"username": "user", "password": "pass"}}
@@ -156,6 +170,41 @@ class TestConfigPersistence:
         assert config2.get("peloton.username") == "user123"
         assert config2.get("peloton.password") == "secret"
 
+    def test_reload_sees_external_edit(self, tmp_path):
+        """A file changed on disk should be re-read, not served from the parse cache."""
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps({"key": "old"}))
+        assert Config(config_path=config_path).get("key") == "old"
+
+        config_path.write_text(json.dumps({"key": "newer"}))
+
+        assert Config(config_path=config_path).get("key") == "newer"
+
+    def test_reload_sees_same_size_save_with_same_mtime(self, tmp_path):
+        """A save that keeps size and mtime (coarse timestamps) must not serve the old parse."""
+        config_path = tmp_path / "config.json"
+        # Written the way _save writes it, so the save below keeps the size
+        config_path.write_text(json.dumps({"key": "x"}, indent=2))
+        assert Config(config_path=config_path).get("key") == "x"
+        old_mtime = config_path.stat().st_mtime_ns
+
+        Config(config_path=config_path).set("key", "y")
+        # Same size; pretend the filesystem couldn't tell the writes apart
+        os.utime(config_path, ns=(old_mtime, old_mtime))
+
+        assert Config(config_path=config_path).get("key") == "y"
+
+    def test_instances_do_not_share_cached_data(self, tmp_path):
+        """Mutating one instance should not leak into later loads of the same file."""
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps({"peloton": {"username": "user123"}}))
+
+        config1 = Config(config_path=config_path)
+        config1._data["peloton"]["username"] = "changed"
+
+        config2 = Config(config_path=config_path)
+        assert config2.get("peloton.username") == "user123"
+
     def test_creates_config_directory(self, tmp_path):
         """Should create config directory if it doesn't exist."""
         config_path = tmp_path / "subdir" / "config.json"
@@ -166,6 +215,51 @@ class TestConfigPersistence:
         assert config_path.parent.exists()
         assert config_path.exists()
 
+    def test_save_leaves_no_temp_files(self, tmp_path):
+        """Saving should replace the config file without leaving temp files around."""
+        config_path = tmp_path / "config.json"
+
+        config = Config(config_path=config_path)
+        config.set("key", "value")
+        config.set("key", "other")
+
+        assert [p.name for p in tmp_path.iterdir()] == ["config.json"]
+        assert json.loads(config_path.read_text()) == {"key": "other"}
+
+    def test_batch_saves_once(self, tmp_path, monkeypatch):
+        """set() calls inside batch() should be written in a single save on exit."""
+        config_path = tmp_path / "config.json"
+        config = Config(config_path=config_path)
+
+        saves = []
+        original_save = config._save
+        monkeypatch.setattr(config, "_save", lambda: (saves.append(1), original_save()))
+
+        with config.batch():
+            config.set("peloton.username", "user123")
+            config.set("peloton.password", "secret")
+            assert not config_path.exists()
+
+        assert len(saves) == 1
+        assert Config(config_path=config_path).get("peloton.password") == "secret"
+
+    def test_batch_exception_leaves_file_untouched(self, tmp_path):
+        """An exception inside batch() should neither save nor keep the partial changes."""
+        config_path = tmp_path / "config.json"
+        config = Config(config_path=config_path)
+        config.set("peloton.username", "user123")
+        before = config_path.read_text()
+
+        with pytest.raises(RuntimeError):
+            with config.batch():
+                config.set("peloton.username", "other")
+                config.set("peloton.password", "secret")
+                raise RuntimeError("interrupted")
+
+        assert config_path.read_text() == before
+        assert config.get("peloton.username") == "user123"
+        assert config.get("peloton.password") is None
+
     def test_handles_missing_config_file(self, tmp_path):
         """Should handle missing config file gracefully."""
         config_path = tmp_path / "nonexistent.json"
@@ -217,3 +311,14 @@ class TestConfigDataDir:
 
         assert data_dir.exists()
         assert data_dir.is_dir()
+
+    def test_creates_directory_once(self, temp_config, monkeypatch):
+        """Repeated access should reuse the path without another mkdir."""
+        first = temp_config.data_dir
+
+        def fail_mkdir(*args, **kwargs):
+            raise AssertionError("mkdir called again")
+
+        monkeypatch.setattr(Path, "mkdir", fail_mkdir)
+
+        assert temp_config.data_dir is first
@@ -2,8 +2,10 @@
 
 import pytest
 from datetime import datetime
+from pathlib import Path
 
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import create_engine, func, inspect, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 
 from datahub.db import (
@@ -15,6 +17,9 @@ from datahub.db import (
     init_db,
     get_engine,
     get_session,
+    dispose_all,
+    bulk_insert_data_points,
+    bulk_insert_transactions,
 )
 
 
@@ -240,6 +245,19 @@ class TestSyncLog:
         assert result.records_added == 0
         assert result.records_updated == 0
 
+    def test_negative_counts_rejected(self, test_session):
+        """records_added and records_updated should not be negative."""
+        log = SyncLog(
+            connector="oura",
+            started_at=datetime(2024, 1, 15, 10, 0),
+            status="success",
+            records_added=-1,
+        )
+        test_session.add(log)
+
+        with pytest.raises(IntegrityError):
+            test_session.commit()
+
     def test_failed_sync_with_error_message(self, test_session):
         """Failed sync should store error message."""
         log = SyncLog(
@@ -299,6 +317,67 @@ class TestInitDb:
         assert "transactions" in tables
         assert "sync_logs" in tables
 
+    def test_creates_composite_indexes(self, tmp_path):
+        """Should create the composite indexes used by range queries and dedup checks."""
+        db_path = tmp_path / "test.db"
+
+        init_db(db_path)
+
+        inspector = inspect(get_engine(db_path))
+        dp_indexes = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes("data_points")}
+        txn_indexes = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes("transactions")}
+
+        assert dp_indexes["ix_datapoint_type_time"] == ["data_type", "timestamp"]
+        assert dp_indexes["ix_datapoint_source_time"] == ["source", "timestamp"]
+        assert txn_indexes["ix_transaction_date_amount"] == ["date", "amount"]
+        assert dp_indexes["ix_datapoint_source_id"] == ["source", "source_id"]
+        assert txn_indexes["ix_transaction_source_id"] == ["source", "source_id"]
+
+    def test_adds_missing_indexes_to_existing_database(self, tmp_path):
+        """Indexes added to the models later should be created on older databases."""
+        db_path = tmp_path / "test.db"
+        engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(engine)
+        # The schema as it was before the (source, source_id) indexes
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_datapoint_source_id")
+            conn.exec_driver_sql("DROP INDEX ix_transaction_source_id")
+        engine.dispose()
+
+        init_db(db_path)
+
+        inspector = inspect(get_engine(db_path))
+        dp_indexes = {ix["name"] for ix in inspector.get_indexes("data_points")}
+        txn_indexes = {ix["name"] for ix in inspector.get_indexes("transactions")}
+        assert "ix_datapoint_source_id" in dp_indexes
+        assert "ix_transaction_source_id" in txn_indexes
+
+    @pytest.mark.parametrize(
+        "stmt,index",
+        [
+            (
+                select(func.count())
+                .select_from(DataPoint)
+                .where(DataPoint.data_type.in_(["workout", "strength_workout"]))
+                .where(DataPoint.timestamp >= datetime(2024, 1, 1)),
+                "ix_datapoint_type_time",
+            ),
+            (
+                select(func.sum(Transaction.amount))
+                .where(Transaction.date >= datetime(2024, 1, 1))
+                .where(Transaction.amount < 0),
+                "ix_transaction_date_amount",
+            ),
+        ],
+    )
+    def test_range_queries_search_composite_index(self, fresh_db, stmt, index):
+        """Dashboard-style range filters should be index searches, not table scans."""
+        sql = str(stmt.compile(get_engine(fresh_db), compile_kwargs={"literal_binds": True}))
+        with get_engine(fresh_db).connect() as conn:
+            plan = " ".join(row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+        assert "SEARCH" in plan and index in plan
+
     def test_idempotent(self, tmp_path):
         """Should be safe to call multiple times."""
         db_path = tmp_path / "test.db"
@@ -360,6 +439,39 @@ class TestGetSession:
         session.close()
 
 
+class TestBulkInsert:
+    """Tests for the dict-based bulk insert helpers."""
+
+    def test_bulk_insert_data_points(self, test_session):
+        """Should insert every row and fill in created_at."""
+        bulk_insert_data_points(test_session, [
+            {"timestamp": datetime(2024, 1, 15, 10, 0), "data_type": "steps", "value": 1000.0, "source": "test"},
+            {"timestamp": datetime(2024, 1, 15, 11, 0), "data_type": "steps", "value": 500.0, "source": "test"},
+        ])
+        test_session.commit()
+
+        points = test_session.query(DataPoint).order_by(DataPoint.timestamp).all()
+        assert [p.value for p in points] == [1000.0, 500.0]
+        assert all(p.created_at is not None for p in points)
+
+    def test_bulk_insert_transactions(self, test_session):
+        """Should insert every row."""
+        bulk_insert_transactions(test_session, [
+            {"date": datetime(2024, 1, 15), "amount": -5.0, "description": "Coffee", "source": "test"},
+            {"date": datetime(2024, 1, 16), "amount": -9.5, "description": "Lunch", "source": "test"},
+        ])
+        test_session.commit()
+
+        assert test_session.query(Transaction).count() == 2
+
+    def test_empty_rows_is_noop(self, test_session):
+        """An empty list should not execute anything."""
+        bulk_insert_data_points(test_session, [])
+        bulk_insert_transactions(test_session, [])
+
+        assert test_session.query(DataPoint).count() == 0
+
+
 class TestGetEngine:
     """Tests for get_engine function."""
 
@@ -373,3 +485,29 @@ class TestGetEngine:
         assert str(engine.url).endswith("test.db")
 
         engine.dispose()
+
+    def test_reuses_engine_for_same_path(self, tmp_path, monkeypatch):
+        """Should hand back one engine per database file, however the path is spelled."""
+        monkeypatch.chdir(tmp_path)
+
+        engine = get_engine(tmp_path / "test.db")
+
+        assert get_engine(Path("test.db")) is engine
+        assert get_engine(tmp_path / "other.db") is not engine
+
+        dispose_all()
+        assert get_engine(tmp_path / "test.db") is not engine
+        dispose_all()
+
+    def test_sets_wal_pragmas(self, tmp_path):
+        """Connections should use WAL journaling, synchronous=NORMAL and a 64 MiB cache."""
+        engine = get_engine(tmp_path / "test.db")
+
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            # 1 == NORMAL
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA mmap_size").scalar() == 268435456
+            assert conn.exec_driver_sql("PRAGMA cache_size").scalar() == -65536
+
+        dispose_all()
@@ -5,8 +5,10 @@ from datetime import datetime
 
 from datahub.db import DataPoint
 from datahub.dedup import (
+    daily_calories_merged,
     get_source_priority,
     deduplicate_daily_totals,
+    fetch_daily_totals_bulk,
     get_deduplicated_total,
     get_daily_average,
     deduplicate_records_by_priority,
@@ -18,35 +20,20 @@ from datahub.dedup import (
 class TestGetSourcePriority:
     """Tests for get_source_priority function."""
 
-    def test_known_source_steps_apple_watch(self):
-        """Apple Watch should have priority 100 for steps."""
-        priority = get_source_priority("steps", "apple_watch")
-        assert priority == 100
-
-    def test_known_source_steps_oura(self):
-        """Oura should have priority 80 for steps."""
-        priority = get_source_priority("steps", "oura")
-        assert priority == 80
-
-    def test_known_source_hrv_oura(self):
-        """Oura should have priority 100 for HRV (best at HRV tracking)."""
-        priority = get_source_priority("hrv", "oura")
-        assert priority == 100
-
-    def test_known_source_sleep_oura(self):
-        """Oura should have priority 100 for sleep tracking."""
-        priority = get_source_priority("sleep_minutes", "oura")
-        assert priority == 100
-
-    def test_unknown_source_returns_default(self):
-        """Unknown source should return DEFAULT_PRIORITY."""
-        priority = get_source_priority("steps", "unknown_device")
-        assert priority == DEFAULT_PRIORITY
-
-    def test_unknown_data_type_returns_default(self):
-        """Unknown data type should return DEFAULT_PRIORITY."""
-        priority = get_source_priority("unknown_type", "apple_watch")
-        assert priority == DEFAULT_PRIORITY
+    @pytest.mark.parametrize(
+        "data_type,source,expected",
+        [
+            ("steps", "apple_watch", 100),
+            ("steps", "oura", 80),
+            ("hrv", "oura", 100),  # Oura is best at HRV tracking
+            ("sleep_minutes", "oura", 100),
+            ("steps", "unknown_device", DEFAULT_PRIORITY),
+            ("unknown_type", "apple_watch", DEFAULT_PRIORITY),
+        ],
+    )
+    def test_source_priority(self, data_type, source, expected):
+        """Known pairs should use the configured priority, anything else the default."""
+        assert get_source_priority(data_type, source) == expected
 
     def test_all_configured_priorities_are_positive(self):
         """All configured priorities should be positive integers."""
@@ -54,6 +41,13 @@ class TestGetSourcePriority:
             for source, priority in sources.items():
                 assert priority > 0, f"{data_type}/{source} has non-positive priority"
 
+    def test_priority_table_is_read_only(self):
+        """SOURCE_PRIORITY should reject edits that the lookup table wouldn't see."""
+        with pytest.raises(TypeError):
+            SOURCE_PRIORITY["steps"]["apple_watch"] = 1
+        with pytest.raises(TypeError):
+            SOURCE_PRIORITY["new_type"] = {}
+
 
 class TestDeduplicateDailyTotals:
     """Tests for deduplicate_daily_totals function."""
@@ -75,7 +69,7 @@ class TestDeduplicateDailyTotals:
                 source="apple_watch",
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         result = deduplicate_daily_totals(
@@ -106,7 +100,7 @@ class TestDeduplicateDailyTotals:
                 source="apple_health",  # priority 50
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         result = deduplicate_daily_totals(
@@ -142,7 +136,7 @@ class TestDeduplicateDailyTotals:
                 source="apple_watch",
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         result = deduplicate_daily_totals(
@@ -155,6 +149,40 @@ class TestDeduplicateDailyTotals:
         assert len(result) == 1
         assert result[0]["total"] == 1000.0
 
+    def test_equal_priority_sources_first_reporter_wins(self, test_session):
+        """Between equally ranked sources in one hour, the earliest source's records count."""
+        points = [
+            DataPoint(
+                timestamp=datetime(2024, 1, 15, 10, 30),
+                data_type="steps",
+                value=900.0,
+                source="unknown_b",
+            ),
+            DataPoint(
+                timestamp=datetime(2024, 1, 15, 10, 10),
+                data_type="steps",
+                value=100.0,
+                source="unknown_a",
+            ),
+            DataPoint(
+                timestamp=datetime(2024, 1, 15, 10, 50),
+                data_type="steps",
+                value=50.0,
+                source="unknown_a",
+            ),
+        ]
+        test_session.bulk_save_objects(points)
+        test_session.commit()
+
+        result = deduplicate_daily_totals(
+            test_session,
+            "steps",
+            datetime(2024, 1, 15),
+            datetime(2024, 1, 15, 23, 59),
+        )
+
+        assert result == [{"date": "2024-01-15", "total": 150.0}]
+
     def test_empty_result_returns_empty_list(self, test_session):
         """No records in range should return empty list."""
         result = deduplicate_daily_totals(
@@ -188,7 +216,7 @@ class TestDeduplicateDailyTotals:
                 source="apple_watch",
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         result = deduplicate_daily_totals(
@@ -222,7 +250,7 @@ class TestDeduplicateDailyTotals:
                 source="apple_watch",
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         result = deduplicate_daily_totals(
@@ -256,6 +284,100 @@ class TestDeduplicateDailyTotals:
         assert len(result) == 1
 
 
+class TestFetchDailyTotalsBulk:
+    """Tests for fetch_daily_totals_bulk function."""
+
+    def test_dedups_each_type_independently(self, test_session):
+        """Each type should pick its own best source per hour."""
+        points = [
+            # Oura beats the iPhone for steps and the Watch for HRV; distance is not asked for
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 0), data_type="steps", value=1000.0, source="oura"),
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 5), data_type="steps", value=900.0, source="apple_health"),
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 0), data_type="hrv", value=40.0, source="apple_watch"),
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 10), data_type="hrv", value=45.0, source="oura"),
+            DataPoint(timestamp=datetime(2024, 1, 16, 8, 0), data_type="hrv", value=50.0, source="oura"),
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 0), data_type="distance", value=3.0, source="oura"),
+        ]
+        test_session.bulk_save_objects(points)
+        test_session.commit()
+
+        result = fetch_daily_totals_bulk(
+            test_session,
+            ["steps", "hrv"],
+            datetime(2024, 1, 15),
+            datetime(2024, 1, 16, 23, 59),
+        )
+
+        assert result == {
+            ("hrv", "2024-01-15"): 45.0,
+            ("hrv", "2024-01-16"): 50.0,
+            ("steps", "2024-01-15"): 1000.0,
+        }
+        assert list(result) == sorted(result)
+
+    def test_newest_first_orders_by_date_then_type(self, test_session):
+        """newest_first should order by date descending, then data type."""
+        points = [
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 0), data_type="steps", value=100.0, source="apple_watch"),
+            DataPoint(timestamp=datetime(2024, 1, 16, 10, 0), data_type="steps", value=200.0, source="apple_watch"),
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 0), data_type="hrv", value=40.0, source="oura"),
+            DataPoint(timestamp=datetime(2024, 1, 16, 10, 0), data_type="hrv", value=50.0, source="oura"),
+        ]
+        test_session.bulk_save_objects(points)
+        test_session.commit()
+
+        result = fetch_daily_totals_bulk(
+            test_session,
+            ["steps", "hrv"],
+            datetime(2024, 1, 15),
+            datetime(2024, 1, 16, 23, 59),
+            newest_first=True,
+        )
+
+        assert list(result) == [
+            ("hrv", "2024-01-16"),
+            ("steps", "2024-01-16"),
+            ("hrv", "2024-01-15"),
+            ("steps", "2024-01-15"),
+        ]
+
+    def test_matches_per_type_calls(self, test_session, sample_datapoints):
+        """The bulk result should agree with deduplicate_daily_totals per type."""
+        start, end = datetime(2024, 1, 1), datetime(2024, 2, 1)
+        bulk = fetch_daily_totals_bulk(test_session, ["steps"], start, end)
+        single = deduplicate_daily_totals(test_session, "steps", start, end)
+
+        assert [{"date": day, "total": total} for (_, day), total in bulk.items()] == single
+
+
+class TestDailyCaloriesMerged:
+    """Tests for daily_calories_merged function."""
+
+    def test_merges_active_and_resting_by_day(self, test_session):
+        """Days with active calories get their resting total alongside, or zero."""
+        points = [
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 0), data_type="active_calories", value=300.0, source="apple_watch"),
+            DataPoint(timestamp=datetime(2024, 1, 15, 10, 20), data_type="active_calories", value=250.0, source="oura"),
+            DataPoint(timestamp=datetime(2024, 1, 15, 12, 0), data_type="resting_calories", value=1500.0, source="apple_watch"),
+            DataPoint(timestamp=datetime(2024, 1, 16, 9, 0), data_type="active_calories", value=200.0, source="apple_watch"),
+            # Resting only: no active calories that day, so it is left out
+            DataPoint(timestamp=datetime(2024, 1, 17, 9, 0), data_type="resting_calories", value=1400.0, source="apple_watch"),
+        ]
+        test_session.bulk_save_objects(points)
+        test_session.commit()
+
+        result = daily_calories_merged(test_session, datetime(2024, 1, 15), datetime(2024, 1, 17, 23, 59))
+
+        assert result == [
+            {"date": "2024-01-15", "active": 300.0, "resting": 1500.0, "total": 1800.0},
+            {"date": "2024-01-16", "active": 200.0, "resting": 0.0, "total": 200.0},
+        ]
+
+    def test_empty_returns_empty_list(self, test_session):
+        """Should return an empty list when there is no calorie data."""
+        assert daily_calories_merged(test_session, datetime(2024, 1, 1), datetime(2024, 1, 31)) == []
+
+
 class TestGetDeduplicatedTotal:
     """Tests for get_deduplicated_total function."""
 
@@ -275,7 +397,7 @@ class TestGetDeduplicatedTotal:
                 source="apple_watch",
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         total = get_deduplicated_total(
@@ -318,7 +440,7 @@ class TestGetDailyAverage:
                 source="apple_watch",
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         avg = get_daily_average(
@@ -364,7 +486,7 @@ class TestDeduplicateRecordsByPriority:
                 source="apple_watch",
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         # With 30-minute buckets, these should be in same bucket
@@ -397,7 +519,7 @@ class TestDeduplicateRecordsByPriority:
                 source="apple_watch",  # higher priority
             ),
         ]
-        test_session.add_all(points)
+        test_session.bulk_save_objects(points)
         test_session.commit()
 
         result = deduplicate_records_by_priority(
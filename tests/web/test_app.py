@@ -5,7 +5,6 @@ import json
 from datetime import datetime, timedelta
 
 from starlette.testclient import TestClient
-from sqlalchemy.orm import sessionmaker
 
 from datahub.db import Base, DataPoint, Transaction, SyncLog
 
@@ -26,10 +25,17 @@ class TestDashboardRoute:
         # Should contain basic dashboard structure
         assert b"<!DOCTYPE html>" in response.content or b"<html" in response.content
 
-    def test_with_sample_data(self, test_client, test_engine, sample_datapoints, sample_transactions):
+    def test_with_sample_data(self, test_client, web_samples):
         """Should render dashboard with data present."""
+        web_samples("datapoints", "transactions")
+
         response = test_client.get("/")
         assert response.status_code == 200
+        assert response.context["data_by_type"] == [{"data_type": "steps", "count": 4}]
+        assert [txn.description for txn in response.context["recent_txns"]] == [
+            "Refund", "Grocery Store", "Coffee Shop",
+        ]
+        assert "Coffee Shop" in response.text
 
     def test_contains_expected_sections(self, test_client):
         """Dashboard should contain key sections."""
@@ -38,6 +44,23 @@ class TestDashboardRoute:
         # Dashboard typically has stats sections
         assert response.status_code == 200
 
+    def test_context_cached_until_next_sync(self, test_client, web_test_db):
+        """Repeat hits should reuse the context until a sync is logged."""
+        _, TestSessionLocal = web_test_db
+        now = datetime.now()
+
+        assert 'text-blue-400 mt-2">0</div>' in test_client.get("/").text
+
+        with TestSessionLocal() as session:
+            session.add(DataPoint(timestamp=now - timedelta(days=1), data_type="workout", value=45.0, source="peloton"))
+            session.commit()
+        assert 'text-blue-400 mt-2">0</div>' in test_client.get("/").text
+
+        with TestSessionLocal() as session:
+            session.add(SyncLog(connector="peloton", started_at=now, status="success"))
+            session.commit()
+        assert 'text-blue-400 mt-2">1</div>' in test_client.get("/").text
+
 
 class TestFitnessRoute:
     """Tests for the fitness route (GET /fitness)."""
@@ -53,41 +76,109 @@ class TestFitnessRoute:
         response = test_client.get("/fitness")
         assert response.status_code == 200
 
-    def test_with_workout_data(self, test_client, test_engine, sample_workouts):
+    def test_with_workout_data(self, test_client, web_samples):
         """Should render fitness page with workout data."""
+        web_samples("workouts")
+
         response = test_client.get("/fitness")
         assert response.status_code == 200
+        assert [w.source for w in response.context["workouts"]] == ["peloton", "tonal", "peloton"]
+        assert [w["duration"] for w in response.context["strength_workouts"]] == [60.0]
+
+    def test_with_volume_data(self, test_client, web_samples):
+        """Volume older than 30 days should not count towards the total."""
+        web_samples("volume")
 
-    def test_with_volume_data(self, test_client, test_engine, sample_volume):
-        """Should render fitness page with Tonal volume data."""
         response = test_client.get("/fitness")
         assert response.status_code == 200
+        assert response.context["total_volume"] == 0
 
-    def test_strength_workout_metadata_parsing(self, test_client, test_engine):
+    def test_strength_workout_metadata_parsing(self, test_client, web_session):
         """Should correctly parse strength workout metadata."""
-        # Create a strength workout with metadata
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
+        timestamp = datetime.now() - timedelta(days=1)
         metadata = {
-            "workout_name": "Full Body Strength",
-            "total_volume": 18500,
-            "exercises": 12,
+            "name": "Full Body Strength",
+            "total_volume_lbs": 18500,
+            "total_sets": 12,
+            "exercises": [],
         }
-        workout = DataPoint(
-            timestamp=datetime.now() - timedelta(days=1),
+        web_session.add(DataPoint(
+            timestamp=timestamp,
             data_type="strength_workout",
             value=55.0,
             unit="minutes",
             source="tonal",
             metadata_json=json.dumps(metadata),
-        )
-        session.add(workout)
-        session.commit()
-        session.close()
+        ))
+        web_session.commit()
+
+        response = test_client.get("/fitness")
+        assert response.status_code == 200
+        assert response.context["strength_workouts"] == [{
+            "timestamp": timestamp,
+            "duration": 55.0,
+            "source": "tonal",
+            "name": "Full Body Strength",
+            "total_sets": 12,
+            "total_volume_lbs": 18500,
+        }]
+
+    def test_strength_workout_metadata_rendered(self, test_client, web_test_db):
+        """Metadata fields should reach the page; malformed metadata is skipped."""
+        _, TestSessionLocal = web_test_db
+        now = datetime.now()
+        with TestSessionLocal() as session:
+            session.add_all([
+                DataPoint(
+                    timestamp=now - timedelta(days=1),
+                    data_type="strength_workout",
+                    value=55.0,
+                    source="tonal",
+                    metadata_json=json.dumps({
+                        "name": "Full Body Strength",
+                        "instructor": "Coach A",
+                        "total_sets": 24,
+                        "total_volume_lbs": 18500,
+                    }),
+                ),
+                DataPoint(
+                    timestamp=now - timedelta(days=2),
+                    data_type="strength_workout",
+                    value=40.0,
+                    source="tonal",
+                    metadata_json="{not json",
+                ),
+            ])
+            session.commit()
+
+        response = test_client.get("/fitness")
+        assert response.status_code == 200
+        text = response.text
+        assert "Full Body Strength" in text and "Coach A" in text
+        assert "24 sets" in text and "18,500 lbs" in text
+        assert "Strength Workout" in text  # default name for the malformed row
+
+    def test_strength_workouts_not_crowded_out(self, test_client, web_test_db):
+        """Older strength workouts should still show when 50+ newer workouts exist."""
+        _, TestSessionLocal = web_test_db
+        now = datetime.now()
+        with TestSessionLocal() as session:
+            session.add_all([
+                DataPoint(timestamp=now - timedelta(hours=i + 1), data_type="workout", value=30.0, source="peloton")
+                for i in range(60)
+            ])
+            session.add(DataPoint(
+                timestamp=now - timedelta(days=10),
+                data_type="strength_workout",
+                value=50.0,
+                source="tonal",
+                metadata_json=json.dumps({"name": "Leg Day"}),
+            ))
+            session.commit()
 
         response = test_client.get("/fitness")
         assert response.status_code == 200
+        assert "Leg Day" in response.text
 
 
 class TestFinanceRoute:
@@ -104,16 +195,20 @@ class TestFinanceRoute:
         response = test_client.get("/finance")
         assert response.status_code == 200
 
-    def test_with_transaction_data(self, test_client, test_engine, sample_transactions):
+    def test_with_transaction_data(self, test_client, web_samples):
         """Should render finance page with transaction data."""
+        web_samples("transactions")
+
         response = test_client.get("/finance")
         assert response.status_code == 200
+        assert [txn.description for txn in response.context["recent_txns"]] == [
+            "Refund", "Grocery Store", "Coffee Shop",
+        ]
+        # All sample transactions are older than the 30-day spending window
+        assert response.context["spending_by_cat"] == []
 
-    def test_spending_by_category_aggregation(self, test_client, test_engine):
+    def test_spending_by_category_aggregation(self, test_client, web_session):
         """Should aggregate spending by category."""
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
         # Create transactions in different categories
         now = datetime.now()
         transactions = [
@@ -139,18 +234,19 @@ class TestFinanceRoute:
                 source="test",
             ),
         ]
-        session.add_all(transactions)
-        session.commit()
-        session.close()
+        web_session.bulk_save_objects(transactions)
+        web_session.commit()
 
         response = test_client.get("/finance")
         assert response.status_code == 200
+        assert response.context["spending_by_cat"] == [
+            {"category": "Groceries", "total": -150.0, "count": 2},
+            {"category": "Food & Drink", "total": -75.0, "count": 1},
+        ]
+        assert "$150.00" in response.text and "$75.00" in response.text
 
-    def test_recent_transactions_ordering(self, test_client, test_engine):
+    def test_recent_transactions_ordering(self, test_client, web_session):
         """Should show transactions in descending date order."""
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
         now = datetime.now()
         transactions = [
             Transaction(
@@ -166,12 +262,36 @@ class TestFinanceRoute:
                 source="test",
             ),
         ]
-        session.add_all(transactions)
-        session.commit()
-        session.close()
+        web_session.bulk_save_objects(transactions)
+        web_session.commit()
+
+        response = test_client.get("/finance")
+        assert response.status_code == 200
+        assert [txn.description for txn in response.context["recent_txns"]] == [
+            "Newer Transaction", "Older Transaction",
+        ]
+
+    def test_recent_transactions_rendered(self, test_client, web_test_db):
+        """Recent transaction rows should render their fields, newest first."""
+        _, TestSessionLocal = web_test_db
+        with TestSessionLocal() as session:
+            session.bulk_save_objects([
+                Transaction(date=datetime(2024, 1, 10), amount=-100.00, description="Older Transaction", source="test"),
+                Transaction(
+                    date=datetime(2024, 1, 20),
+                    amount=-42.50,
+                    description="Newer Transaction",
+                    category="Groceries",
+                    source="test",
+                ),
+            ])
+            session.commit()
 
         response = test_client.get("/finance")
         assert response.status_code == 200
+        text = response.text
+        assert "2024-01-20" in text and "$-42.50" in text and "Groceries" in text
+        assert text.index("Newer Transaction") < text.index("Older Transaction")
 
 
 class TestStatsAPI:
@@ -201,7 +321,7 @@ class TestStatsAPI:
         session = SessionLocal()
 
         # Add test data
-        session.add_all([
+        session.bulk_save_objects([
             DataPoint(
                 timestamp=datetime.now(),
                 data_type="steps",
@@ -257,7 +377,7 @@ class TestStatsAPI:
                 source="apple_health",  # Lower priority - should be deduplicated
             ),
         ]
-        session.add_all(steps)
+        session.bulk_save_objects(steps)
         session.commit()
         session.close()
 
@@ -280,11 +400,8 @@ class TestStatsAPI:
 class TestDashboardDataCalculations:
     """Tests for dashboard data calculations."""
 
-    def test_steps_week_calculation(self, test_client, test_engine):
+    def test_steps_week_calculation(self, test_client, web_session):
         """Should calculate weekly steps correctly with deduplication."""
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
         now = datetime.now()
         # Add steps from different days within the last week
         steps = [
@@ -307,18 +424,16 @@ class TestDashboardDataCalculations:
                 source="apple_watch",
             ),
         ]
-        session.add_all(steps)
-        session.commit()
-        session.close()
+        web_session.bulk_save_objects(steps)
+        web_session.commit()
 
         response = test_client.get("/")
         assert response.status_code == 200
+        assert response.context["steps_week"] == 15500
+        assert "15,500 this week" in response.text
 
-    def test_spending_month_calculation(self, test_client, test_engine):
+    def test_spending_month_calculation(self, test_client, web_session):
         """Should sum negative amounts for spending."""
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
         now = datetime.now()
         transactions = [
             Transaction(
@@ -340,18 +455,16 @@ class TestDashboardDataCalculations:
                 source="test",
             ),
         ]
-        session.add_all(transactions)
-        session.commit()
-        session.close()
+        web_session.bulk_save_objects(transactions)
+        web_session.commit()
 
         response = test_client.get("/")
         assert response.status_code == 200
+        assert response.context["spending_month"] == 300.0
+        assert "$300.00 this month" in response.text
 
-    def test_workout_count_includes_strength(self, test_client, test_engine):
+    def test_workout_count_includes_strength(self, test_client, web_session):
         """Should count both 'workout' and 'strength_workout' types."""
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
         now = datetime.now()
         workouts = [
             DataPoint(
@@ -373,22 +486,55 @@ class TestDashboardDataCalculations:
                 source="peloton",
             ),
         ]
-        session.add_all(workouts)
-        session.commit()
-        session.close()
+        web_session.bulk_save_objects(workouts)
+        web_session.commit()
+
+        response = test_client.get("/")
+        assert response.status_code == 200
+        assert response.context["workouts_week"] == 3
+
+    def test_summary_counts_rendered(self, test_client, web_test_db):
+        """Workout count and both spending sums should reach the template."""
+        _, TestSessionLocal = web_test_db
+        now = datetime.now()
+        with TestSessionLocal() as session:
+            session.bulk_save_objects([
+                DataPoint(timestamp=now - timedelta(days=1), data_type="workout", value=45.0, source="peloton"),
+                DataPoint(timestamp=now - timedelta(days=2), data_type="strength_workout", value=60.0, source="tonal"),
+                DataPoint(timestamp=now - timedelta(days=20), data_type="workout", value=30.0, source="peloton"),
+                Transaction(date=now - timedelta(days=5), amount=-100.00, description="A", source="test"),
+                Transaction(date=now - timedelta(days=10), amount=-200.00, description="B", source="test"),
+                Transaction(date=now - timedelta(days=15), amount=50.00, description="Refund", source="test"),
+                Transaction(date=now - timedelta(days=45), amount=-150.00, description="C", source="test"),
+            ])
+            session.commit()
+
+        response = test_client.get("/")
+        assert response.status_code == 200
+        assert 'text-blue-400 mt-2">2</div>' in response.text
+        assert "$10.00" in response.text  # 300 over 30 days
+        assert "-100.0% vs last month" in response.text
+
+    def test_chart_series_rendered_as_json(self, test_client, web_test_db):
+        """Chart series should be embedded as JSON, as the tojson filter writes it."""
+        _, TestSessionLocal = web_test_db
+        day = datetime.now() - timedelta(days=1)
+        with TestSessionLocal() as session:
+            session.add(DataPoint(timestamp=day, data_type="steps", value=1234.0, source="apple_watch"))
+            session.commit()
 
         response = test_client.get("/")
         assert response.status_code == 200
+        expected = json.dumps([{"date": day.date().isoformat(), "total": 1234.0}], sort_keys=True)
+        assert f"const stepsData = {expected};" in response.text
+        assert "const sleepData = [];" in response.text
 
 
 class TestFitnessDataCalculations:
     """Tests for fitness page data calculations."""
 
-    def test_total_volume_calculation(self, test_client, test_engine):
+    def test_total_volume_calculation(self, test_client, web_session):
         """Should calculate total volume lifted in last 30 days."""
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
         now = datetime.now()
         volumes = [
             DataPoint(
@@ -410,37 +556,68 @@ class TestFitnessDataCalculations:
                 source="tonal",
             ),
         ]
-        session.add_all(volumes)
-        session.commit()
-        session.close()
+        web_session.bulk_save_objects(volumes)
+        web_session.commit()
 
         response = test_client.get("/fitness")
         assert response.status_code == 200
+        assert response.context["total_volume"] == 22000
 
-    def test_daily_data_deduplication(self, test_client, test_engine):
+    def test_daily_data_deduplication(self, test_client, web_session):
         """Should deduplicate daily fitness data by priority."""
-        SessionLocal = sessionmaker(bind=test_engine)
-        session = SessionLocal()
-
-        now = datetime.now()
+        # Pinned to the start of an hour so both points share an hour bucket
+        base = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=1)
         # Same hour, different sources
         steps = [
             DataPoint(
-                timestamp=now - timedelta(days=1, hours=10),
+                timestamp=base + timedelta(minutes=10),
                 data_type="steps",
                 value=2000.0,
                 source="apple_watch",  # Higher priority
             ),
             DataPoint(
-                timestamp=now - timedelta(days=1, hours=10, minutes=30),
+                timestamp=base + timedelta(minutes=40),
                 data_type="steps",
                 value=1800.0,
                 source="apple_health",  # Lower priority
             ),
         ]
-        session.add_all(steps)
-        session.commit()
-        session.close()
+        web_session.bulk_save_objects(steps)
+        web_session.commit()
 
         response = test_client.get("/fitness")
         assert response.status_code == 200
+        assert response.context["daily_data"] == [
+            {"date": base.date().isoformat(), "data_type": "steps", "total": 2000.0},
+        ]
+
+
+class TestGetDb:
+    """Tests for the get_db dependency."""
+
+    def test_reuses_engine_across_requests(self, _web_app_module, fresh_db, monkeypatch):
+        """Sessions from successive calls should share one engine."""
+        monkeypatch.setattr(_web_app_module, "_db_path", lambda: fresh_db)
+
+        first_dep = _web_app_module.get_db()
+        second_dep = _web_app_module.get_db()
+        first, second = next(first_dep), next(second_dep)
+        try:
+            assert first is not second
+            assert first.get_bind() is second.get_bind()
+        finally:
+            first_dep.close()
+            second_dep.close()
+
+    def test_closes_session_when_route_raises(self, _web_app_module, fresh_db, monkeypatch):
+        """The session should be closed even if the request fails."""
+        monkeypatch.setattr(_web_app_module, "_db_path", lambda: fresh_db)
+
+        dep = _web_app_module.get_db()
+        session = next(dep)
+        closed = []
+        monkeypatch.setattr(session, "close", lambda: closed.append(True))
+
+        with pytest.raises(RuntimeError):
+            dep.throw(RuntimeError("boom"))
+        assert closed == [True]
@@ -1,66 +1,169 @@
 """DataHub Web Dashboard."""
 
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
+from typing import Iterator
 
-from fastapi import FastAPI, Request
+import jinja2
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy import func, select
+from jinja2.utils import htmlsafe_json_dumps
+from markupsafe import Markup
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
 
 from datahub.config import Config
 from datahub.db import get_session, DataPoint, Transaction, SyncLog
-from datahub.dedup import deduplicate_daily_totals, get_deduplicated_total
+from datahub.dedup import (
+    daily_calories_merged,
+    fetch_daily_totals_bulk,
+    get_daily_average,
+    get_deduplicated_total,
+)
 
 app = FastAPI(title="DataHub Dashboard")
 
-# Templates
+# Templates. auto_reload is off: templates ship with the app and the server
+# runs without a reload mode, so there's no point re-checking each template's
+# mtime on every render once it has been compiled.
 templates_dir = Path(__file__).parent / "templates"
-templates = Jinja2Templates(directory=templates_dir)
+templates = Jinja2Templates(env=jinja2.Environment(
+    loader=jinja2.FileSystemLoader(templates_dir),
+    autoescape=jinja2.select_autoescape(),
+    auto_reload=False,
+))
 
 
-def get_db():
-    """Get database session."""
-    config = Config()
-    return get_session(config.get_db_path())
+@lru_cache(maxsize=1)
+def _db_path() -> Path:
+    """Database path, read from the config once per process."""
+    return Config().get_db_path()
+
+
+def get_db() -> Iterator[Session]:
+    """Get database session, closed once the request is done.
+
+    The engine and session factory behind it are cached per path in datahub.db,
+    so a request only checks a connection out of the existing pool. Closing in
+    finally returns it to the pool even when the route raises.
+    """
+    session = get_session(_db_path())
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+# Transaction columns the templates show; plain rows skip building ORM objects
+_TXN_COLUMNS = (Transaction.date, Transaction.description, Transaction.category, Transaction.amount)
+
+# Strength workout metadata fields shown on the fitness page. Malformed JSON
+# yields NULLs rather than an error, like a failed parse used to be skipped.
+_STRENGTH_META_FIELDS = ("name", "instructor", "total_sets", "total_volume_lbs")
+_STRENGTH_META_COLUMNS = tuple(
+    case(
+        (func.json_valid(DataPoint.metadata_json) == 1,
+         func.json_extract(DataPoint.metadata_json, f"$.{field}")),
+    ).label(field)
+    for field in _STRENGTH_META_FIELDS
+)
+
+
+def _daily_series(totals: dict[tuple[str, str], float], data_type: str) -> dict[str, float]:
+    """Date -> total for one data type, out of fetch_daily_totals_bulk's result."""
+    return {day: total for (dt, day), total in totals.items() if dt == data_type}
+
+
+def _chart_json(data: list[dict]) -> Markup:
+    """Chart data as the JSON the tojson filter would emit.
+
+    Serialized when the dashboard context is built, so cached contexts don't
+    re-encode their chart series on every render.
+    """
+    return htmlsafe_json_dumps(data, **templates.env.policies["json.dumps_kwargs"])
+
+
+# Routes are plain functions: the database calls in them block, so FastAPI runs
+# them in its threadpool instead of stalling the event loop for every request.
+
+
+# Dashboard contexts, keyed by (engine, latest sync id, latest sync completion)
+# and kept for a short while; new data arrives through syncs, which run in the
+# CLI process and move the key when they start and finish.
+_DASHBOARD_TTL = 60.0
+_DASHBOARD_CACHE: dict[tuple, tuple[float, dict]] = {}
 
 
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request):
+def dashboard(request: Request, session: Session = Depends(get_db)):
     """Main dashboard view."""
-    session = get_db()
+    last_sync_id, last_sync_completed = session.execute(
+        select(func.max(SyncLog.id), func.max(SyncLog.completed_at))
+    ).one()
+    key = (session.get_bind(), last_sync_id, last_sync_completed)
+
+    clock = time.monotonic()
+    cached = _DASHBOARD_CACHE.get(key)
+    if cached is not None and cached[0] > clock:
+        context = cached[1]
+    else:
+        context = _dashboard_context(session)
+        for stale in [k for k, (expires, _) in list(_DASHBOARD_CACHE.items()) if expires <= clock]:
+            _DASHBOARD_CACHE.pop(stale, None)
+        _DASHBOARD_CACHE[key] = (clock + _DASHBOARD_TTL, context)
+
+    # Copied, since TemplateResponse adds the request to the dict it is given
+    return templates.TemplateResponse(request, "dashboard.html", dict(context))
+
 
+def _dashboard_context(session: Session) -> dict:
+    """Compute the dashboard's template context."""
     # Get summary stats
     now = datetime.now()
     week_ago = now - timedelta(days=7)
     month_ago = now - timedelta(days=30)
     two_months_ago = now - timedelta(days=60)
+    two_weeks_ago = now - timedelta(days=14)
+
+    # Deduplicated daily totals for the week's step and calorie cards, in one query
+    week_totals = fetch_daily_totals_bulk(
+        session,
+        ["steps", "active_calories", "resting_calories"],
+        week_ago,
+        now,
+    )
 
     # Steps this week (deduplicated)
-    steps_week = get_deduplicated_total(session, "steps", week_ago, now)
-
-    # Workouts this week (including Tonal strength workouts)
-    workouts_week = session.execute(
-        select(func.count(DataPoint.id))
-        .where(DataPoint.data_type.in_(["workout", "strength_workout"]))
-        .where(DataPoint.timestamp >= week_ago)
-    ).scalar() or 0
+    steps_week = sum(_daily_series(week_totals, "steps").values())
 
-    # Spending this month
-    spending_month = session.execute(
-        select(func.sum(Transaction.amount))
-        .where(Transaction.date >= month_ago)
-        .where(Transaction.amount < 0)
-    ).scalar() or 0
-
-    # Spending last month (for comparison)
-    spending_last_month = session.execute(
-        select(func.sum(Transaction.amount))
-        .where(Transaction.date >= two_months_ago)
-        .where(Transaction.date < month_ago)
-        .where(Transaction.amount < 0)
-    ).scalar() or 0
+    # Workouts this week (including Tonal strength workouts), spending this
+    # month and spending last month (for comparison), in one statement as
+    # scalar subqueries
+    workouts_week, spending_month, spending_last_month = session.execute(
+        select(
+            select(func.count())
+            .select_from(DataPoint)
+            .where(DataPoint.data_type.in_(["workout", "strength_workout"]))
+            .where(DataPoint.timestamp >= week_ago)
+            .scalar_subquery(),
+            select(func.sum(Transaction.amount))
+            .where(Transaction.date >= month_ago)
+            .where(Transaction.amount < 0)
+            .scalar_subquery(),
+            select(func.sum(Transaction.amount))
+            .where(Transaction.date >= two_months_ago)
+            .where(Transaction.date < month_ago)
+            .where(Transaction.amount < 0)
+            .scalar_subquery(),
+        )
+    ).one()
+    workouts_week = workouts_week or 0
+    spending_month = spending_month or 0
+    spending_last_month = spending_last_month or 0
 
     # Calculate spending change percentage
     if spending_last_month and spending_last_month != 0:
@@ -69,73 +172,58 @@ async def dashboard(request: Request):
         spending_change = None
 
     # Calories this week (deduplicated)
-    active_calories_week = get_deduplicated_total(session, "active_calories", week_ago, now)
-    resting_calories_week = get_deduplicated_total(session, "resting_calories", week_ago, now)
+    active_calories_week = sum(_daily_series(week_totals, "active_calories").values())
+    resting_calories_week = sum(_daily_series(week_totals, "resting_calories").values())
     total_calories_week = active_calories_week + resting_calories_week
 
     # Average sleep this week (deduplicated)
-    sleep_data = deduplicate_daily_totals(session, "sleep_minutes", week_ago, now)
-    avg_sleep_minutes = sum(d["total"] for d in sleep_data) / len(sleep_data) if sleep_data else 0
+    avg_sleep_minutes = get_daily_average(session, "sleep_minutes", week_ago, now)
     avg_sleep_hours = avg_sleep_minutes / 60
 
     # Average HRV this week (deduplicated)
-    hrv_data = deduplicate_daily_totals(session, "hrv", week_ago, now)
-    avg_hrv = sum(d["total"] for d in hrv_data) / len(hrv_data) if hrv_data else 0
+    avg_hrv = get_daily_average(session, "hrv", week_ago, now)
 
     # Recent data points by type
     data_by_type_rows = session.execute(
         select(
             DataPoint.data_type,
-            func.count(DataPoint.id).label("count"),
+            func.count().label("count"),
         )
         .group_by(DataPoint.data_type)
-        .order_by(func.count(DataPoint.id).desc())
+        .order_by(func.count().desc())
         .limit(10)
     ).all()
     # Convert to JSON-serializable format
     data_by_type = [{"data_type": row.data_type, "count": row.count} for row in data_by_type_rows]
 
-    # Daily steps for chart (last 14 days) - deduplicated
-    daily_steps = deduplicate_daily_totals(
-        session, "steps", now - timedelta(days=14), now
+    # Deduplicated daily totals for the charts (last 14 days), in one query
+    chart_totals = fetch_daily_totals_bulk(
+        session, ["steps", "sleep_minutes"], two_weeks_ago, now
     )
 
-    # Daily calories for chart (last 14 days) - deduplicated
-    daily_active_cal = deduplicate_daily_totals(
-        session, "active_calories", now - timedelta(days=14), now
-    )
-    daily_resting_cal = deduplicate_daily_totals(
-        session, "resting_calories", now - timedelta(days=14), now
-    )
+    # Daily steps for chart
+    daily_steps = [
+        {"date": day, "total": total}
+        for day, total in _daily_series(chart_totals, "steps").items()
+    ]
 
-    # Merge active and resting calories by date
-    resting_by_date = {d["date"]: d["total"] for d in daily_resting_cal}
-    daily_calories = []
-    for d in daily_active_cal:
-        daily_calories.append({
-            "date": d["date"],
-            "active": d["total"],
-            "resting": resting_by_date.get(d["date"], 0),
-            "total": d["total"] + resting_by_date.get(d["date"], 0),
-        })
-
-    # Daily sleep for trend (last 14 days)
-    daily_sleep = deduplicate_daily_totals(
-        session, "sleep_minutes", now - timedelta(days=14), now
-    )
-    # Convert to hours
-    daily_sleep = [{"date": d["date"], "hours": d["total"] / 60} for d in daily_sleep]
+    # Active and resting calories by date, merged in SQL
+    daily_calories = daily_calories_merged(session, two_weeks_ago, now)
+
+    # Daily sleep for trend, converted to hours
+    daily_sleep = [
+        {"date": day, "hours": total / 60}
+        for day, total in _daily_series(chart_totals, "sleep_minutes").items()
+    ]
 
     # Recent transactions
     recent_txns = session.execute(
-        select(Transaction)
+        select(*_TXN_COLUMNS)
         .order_by(Transaction.date.desc())
         .limit(10)
-    ).scalars().all()
-
-    session.close()
+    ).all()
 
-    return templates.TemplateResponse(request, "dashboard.html", {
+    return {
         "steps_week": int(steps_week),
         "workouts_week": workouts_week,
         "spending_month": abs(spending_month),
@@ -146,38 +234,38 @@ async def dashboard(request: Request):
         "avg_sleep_hours": avg_sleep_hours,
         "avg_hrv": avg_hrv,
         "data_by_type": data_by_type,
-        "daily_steps": daily_steps,
-        "daily_calories": daily_calories,
-        "daily_sleep": daily_sleep,
+        "daily_steps_json": _chart_json(daily_steps),
+        "daily_calories_json": _chart_json(daily_calories),
+        "daily_sleep_json": _chart_json(daily_sleep),
         "recent_txns": recent_txns,
-    })
+    }
 
 
 @app.get("/fitness", response_class=HTMLResponse)
-async def fitness(request: Request):
+def fitness(request: Request, session: Session = Depends(get_db)):
     """Fitness data view."""
-    import json
-    session = get_db()
-
     now = datetime.now()
+    month_ago = now - timedelta(days=30)
 
     # Get workout history (including strength workouts from Tonal)
     workouts = session.execute(
-        select(DataPoint)
+        select(DataPoint.timestamp, DataPoint.value, DataPoint.source)
         .where(DataPoint.data_type.in_(["workout", "strength_workout"]))
         .order_by(DataPoint.timestamp.desc())
         .limit(50)
-    ).scalars().all()
+    ).all()
 
-    # Get Tonal strength workouts specifically for detailed view
+    # Get Tonal strength workouts specifically for detailed view, with the
+    # metadata fields the template shows pulled out by SQLite's JSON functions.
+    # A separate LIMITed query, so the JSON is only read for these rows and
+    # strength workouts aren't crowded out of the list by newer cardio.
     strength_workouts = session.execute(
-        select(DataPoint)
+        select(DataPoint.timestamp, DataPoint.value, DataPoint.source, *_STRENGTH_META_COLUMNS)
         .where(DataPoint.data_type == "strength_workout")
         .order_by(DataPoint.timestamp.desc())
         .limit(20)
-    ).scalars().all()
+    ).all()
 
-    # Parse metadata for strength workouts
     strength_details = []
     for sw in strength_workouts:
         detail = {
@@ -185,38 +273,32 @@ async def fitness(request: Request):
             "duration": sw.value,
             "source": sw.source,
         }
-        if sw.metadata_json:
-            try:
-                meta = json.loads(sw.metadata_json)
-                detail.update(meta)
-            except json.JSONDecodeError:
-                pass
+        for field in _STRENGTH_META_FIELDS:
+            value = getattr(sw, field)
+            if value is not None:
+                detail[field] = value
         strength_details.append(detail)
 
-    # Daily summaries for last 30 days (deduplicated)
-    daily_data = []
-    for data_type in ["steps", "active_calories", "heart_rate"]:
-        deduped = deduplicate_daily_totals(
-            session, data_type, now - timedelta(days=30), now
-        )
-        for row in deduped:
-            daily_data.append({
-                "date": row["date"],
-                "data_type": data_type,
-                "total": row["total"],
-            })
-    # Sort by date descending
-    daily_data.sort(key=lambda x: x["date"], reverse=True)
+    # Daily summaries for last 30 days (deduplicated), newest first
+    daily_totals = fetch_daily_totals_bulk(
+        session,
+        ["steps", "active_calories", "heart_rate"],
+        month_ago,
+        now,
+        newest_first=True,
+    )
+    daily_data = [
+        {"date": day, "data_type": data_type, "total": total}
+        for (data_type, day), total in daily_totals.items()
+    ]
 
     # Total volume lifted (Tonal)
     total_volume = session.execute(
         select(func.sum(DataPoint.value))
         .where(DataPoint.data_type == "volume")
-        .where(DataPoint.timestamp >= now - timedelta(days=30))
+        .where(DataPoint.timestamp >= month_ago)
     ).scalar() or 0
 
-    session.close()
-
     return templates.TemplateResponse(request, "fitness.html", {
         "workouts": workouts,
         "daily_data": daily_data,
@@ -226,10 +308,8 @@ async def fitness(request: Request):
 
 
 @app.get("/finance", response_class=HTMLResponse)
-async def finance(request: Request):
+def finance(request: Request, session: Session = Depends(get_db)):
     """Finance data view."""
-    session = get_db()
-
     now = datetime.now()
     month_ago = now - timedelta(days=30)
 
@@ -238,7 +318,7 @@ async def finance(request: Request):
         select(
             Transaction.category,
             func.sum(Transaction.amount).label("total"),
-            func.count(Transaction.id).label("count"),
+            func.count().label("count"),
         )
         .where(Transaction.date >= month_ago)
         .where(Transaction.amount < 0)
@@ -253,10 +333,10 @@ async def finance(request: Request):
 
     # Recent transactions
     recent_txns = session.execute(
-        select(Transaction)
+        select(*_TXN_COLUMNS)
         .order_by(Transaction.date.desc())
         .limit(50)
-    ).scalars().all()
+    ).all()
 
     # Daily spending
     daily_spending_rows = session.execute(
@@ -272,8 +352,6 @@ async def finance(request: Request):
     # Convert to JSON-serializable format
     daily_spending = [{"date": str(row.date), "total": row.total} for row in daily_spending_rows]
 
-    session.close()
-
     return templates.TemplateResponse(request, "finance.html", {
         "spending_by_cat": spending_by_cat,
         "recent_txns": recent_txns,
@@ -282,24 +360,25 @@ async def finance(request: Request):
 
 
 @app.get("/api/stats")
-async def api_stats():
+def api_stats(session: Session = Depends(get_db)):
     """API endpoint for dashboard stats."""
-    session = get_db()
-
     now = datetime.now()
     week_ago = now - timedelta(days=7)
 
+    # Both table counts in one statement, as scalar subqueries
+    data_points_total, transactions_total = session.execute(
+        select(
+            select(func.count()).select_from(DataPoint).scalar_subquery(),
+            select(func.count()).select_from(Transaction).scalar_subquery(),
+        )
+    ).one()
+
     stats = {
         "steps_week": get_deduplicated_total(session, "steps", week_ago, now),
-        "data_points_total": session.execute(
-            select(func.count(DataPoint.id))
-        ).scalar() or 0,
-        "transactions_total": session.execute(
-            select(func.count(Transaction.id))
-        ).scalar() or 0,
+        "data_points_total": data_points_total,
+        "transactions_total": transactions_total,
     }
 
-    session.close()
     return stats
 
 